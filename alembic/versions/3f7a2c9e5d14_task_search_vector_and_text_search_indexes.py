@@ -0,0 +1,51 @@
+"""task search_vector and text search indexes
+
+Revision ID: 3f7a2c9e5d14
+Revises: e91f4d6a2c53
+Create Date: 2026-10-18 12:58:41.602318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f7a2c9e5d14'
+down_revision: Union[str, None] = 'e91f4d6a2c53'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Keep in sync with TASK_SEARCH_CONFIG and TASK_SEARCH_TEXT in backend/app/schemas.py
+SEARCH_TEXT = "(coalesce(title, '') || ' ' || coalesce(description, ''))"
+
+
+def upgrade() -> None:
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.execute('CREATE EXTENSION IF NOT EXISTS btree_gin')
+
+    # Adding a stored generated column rewrites tasks once
+    op.add_column('tasks', sa.Column(
+        'search_vector', postgresql.TSVECTOR(),
+        sa.Computed(f"to_tsvector('english'::regconfig, {SEARCH_TEXT})", persisted=True), nullable=True
+    ))
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_tasks_user_id_search_vector', 'tasks', ['user_id', 'search_vector'], unique=False,
+            postgresql_using='gin', postgresql_concurrently=True, if_not_exists=True
+        )
+        op.create_index(
+            'ix_tasks_user_id_search_text_trgm', 'tasks', ['user_id', sa.text(f'{SEARCH_TEXT} gin_trgm_ops')],
+            unique=False, postgresql_using='gin', postgresql_concurrently=True, if_not_exists=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_tasks_user_id_search_text_trgm', table_name='tasks', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_tasks_user_id_search_vector', table_name='tasks', postgresql_concurrently=True, if_exists=True)
+
+    op.drop_column('tasks', 'search_vector')
@@ -0,0 +1,63 @@
+"""users data_version bumped by triggers
+
+Revision ID: 5e8f1b3c9a62
+Revises: c4a9e2d7b815
+Create Date: 2026-10-18 15:41:29.058317
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e8f1b3c9a62'
+down_revision: Union[str, None] = 'c4a9e2d7b815'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Every statement writing tasks or tags bumps the data_version of each user it touched, once
+BUMP_FUNCTION = """
+CREATE FUNCTION users_bump_data_version() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE users SET data_version = data_version + 1 WHERE user_id IN (SELECT user_id FROM new_rows);
+    ELSIF TG_OP = 'UPDATE' THEN
+        UPDATE users SET data_version = data_version + 1
+        WHERE user_id IN (SELECT user_id FROM new_rows UNION SELECT user_id FROM old_rows);
+    ELSE
+        UPDATE users SET data_version = data_version + 1 WHERE user_id IN (SELECT user_id FROM old_rows);
+    END IF;
+
+    RETURN NULL;
+END
+$$
+"""
+
+TRIGGERS = {
+    'INSERT': 'REFERENCING NEW TABLE AS new_rows',
+    'UPDATE': 'REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows',
+    'DELETE': 'REFERENCING OLD TABLE AS old_rows',
+}
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('data_version', sa.BigInteger(), server_default='0', nullable=False))
+
+    op.execute(BUMP_FUNCTION)
+    for table in ('tasks', 'tags'):
+        for event, referencing in TRIGGERS.items():
+            op.execute(
+                f'CREATE TRIGGER {table}_data_version_{event.lower()} AFTER {event} ON {table} {referencing} '
+                'FOR EACH STATEMENT EXECUTE FUNCTION users_bump_data_version()'
+            )
+
+
+def downgrade() -> None:
+    for table in ('tasks', 'tags'):
+        for event in TRIGGERS:
+            op.execute(f'DROP TRIGGER IF EXISTS {table}_data_version_{event.lower()} ON {table}')
+
+    op.execute('DROP FUNCTION IF EXISTS users_bump_data_version()')
+    op.drop_column('users', 'data_version')
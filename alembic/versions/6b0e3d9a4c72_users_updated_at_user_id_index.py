@@ -0,0 +1,37 @@
+"""users updated_at user_id index
+
+Revision ID: 6b0e3d9a4c72
+Revises: f2b8d4a6c391
+Create Date: 2026-10-19 15:42:10.264813
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6b0e3d9a4c72'
+down_revision: Union[str, None] = 'f2b8d4a6c391'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The recently active users are paged by (updated_at, user_id), the new index serves that order
+    # without a sort. Built CONCURRENTLY before the old one is dropped, see e91f4d6a2c53.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_users_updated_at_user_id', 'users', ['updated_at', 'user_id'], unique=False,
+            postgresql_concurrently=True, if_not_exists=True
+        )
+        op.drop_index('ix_users_updated_at', table_name='users', postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_users_updated_at', 'users', ['updated_at'], unique=False,
+            postgresql_concurrently=True, if_not_exists=True
+        )
+        op.drop_index('ix_users_updated_at_user_id', table_name='users', postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,38 @@
+"""revoked_tokens keyed by jti and expiry
+
+Revision ID: 7c1e5a9f3b20
+Revises: d4d386b2007b
+Create Date: 2026-10-18 10:12:31.482913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c1e5a9f3b20'
+down_revision: Union[str, None] = 'd4d386b2007b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing rows hold full JWTs issued without a jti claim, such tokens are rejected by
+    # get_current_user now and expire within ACCESS_TOKEN_EXPIRE_MINUTES, so they can go
+    op.execute('DELETE FROM revoked_tokens')
+    op.drop_column('revoked_tokens', 'token')
+    op.add_column('revoked_tokens', sa.Column('jti', sa.String(length=32), nullable=False))
+    op.add_column('revoked_tokens', sa.Column('expires_at', sa.TIMESTAMP(timezone=True), nullable=False))
+    op.create_index(op.f('ix_revoked_tokens_jti'), 'revoked_tokens', ['jti'], unique=True)
+    op.create_index(op.f('ix_revoked_tokens_expires_at'), 'revoked_tokens', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_revoked_tokens_expires_at'), table_name='revoked_tokens')
+    op.drop_index(op.f('ix_revoked_tokens_jti'), table_name='revoked_tokens')
+    op.drop_column('revoked_tokens', 'expires_at')
+    op.drop_column('revoked_tokens', 'jti')
+    op.execute('DELETE FROM revoked_tokens')
+    op.add_column('revoked_tokens', sa.Column('token', sa.VARCHAR(length=255), autoincrement=False, nullable=False))
@@ -0,0 +1,31 @@
+"""partial index for the overdue sweeper
+
+Revision ID: 8d3b6f1a7e42
+Revises: 3f7a2c9e5d14
+Create Date: 2026-10-18 13:34:17.284590
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d3b6f1a7e42'
+down_revision: Union[str, None] = '3f7a2c9e5d14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_tasks_due_date_pending', 'tasks', ['due_date'], unique=False,
+            postgresql_where=sa.text("status = 'Pending'"), postgresql_concurrently=True, if_not_exists=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_tasks_due_date_pending', table_name='tasks', postgresql_concurrently=True, if_exists=True)
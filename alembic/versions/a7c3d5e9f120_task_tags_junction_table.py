@@ -0,0 +1,97 @@
+"""task_tags junction table
+
+Revision ID: a7c3d5e9f120
+Revises: 5e8f1b3c9a62
+Create Date: 2026-10-18 16:20:44.391862
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c3d5e9f120'
+down_revision: Union[str, None] = '5e8f1b3c9a62'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# tasks.tag_id stays the primary tag of a task (the single tag API), and it is always one of the
+# task's tags: setting it adds the link, changing it replaces the link of the previous primary tag
+SYNC_FUNCTION = """
+CREATE FUNCTION task_tags_sync_primary() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO task_tags (user_id, tag_id, task_id)
+        SELECT user_id, tag_id, task_id FROM new_rows WHERE tag_id IS NOT NULL
+        ON CONFLICT DO NOTHING;
+    ELSE
+        DELETE FROM task_tags AS tt
+        USING old_rows AS o JOIN new_rows AS n ON n.task_id = o.task_id
+        WHERE tt.task_id = o.task_id AND tt.tag_id = o.tag_id AND n.tag_id IS DISTINCT FROM o.tag_id;
+
+        INSERT INTO task_tags (user_id, tag_id, task_id)
+        SELECT n.user_id, n.tag_id, n.task_id
+        FROM new_rows AS n JOIN old_rows AS o ON o.task_id = n.task_id
+        WHERE n.tag_id IS NOT NULL AND n.tag_id IS DISTINCT FROM o.tag_id
+        ON CONFLICT DO NOTHING;
+    END IF;
+
+    RETURN NULL;
+END
+$$
+"""
+
+TRIGGERS = {
+    'INSERT': 'REFERENCING NEW TABLE AS new_rows',
+    'UPDATE': 'REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows',
+    'DELETE': 'REFERENCING OLD TABLE AS old_rows',
+}
+
+
+def upgrade() -> None:
+    op.create_table('task_tags',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('tag_id', sa.Integer(), nullable=False),
+    sa.Column('task_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.user_id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['tag_id'], ['tags.tag_id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['task_id'], ['tasks.task_id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'tag_id', 'task_id')
+    )
+    op.create_index('ix_task_tags_task_id_tag_id', 'task_tags', ['task_id', 'tag_id'], unique=False)
+
+    op.execute(SYNC_FUNCTION)
+    for event in ('INSERT', 'UPDATE'):
+        op.execute(
+            f'CREATE TRIGGER task_tags_sync_{event.lower()} AFTER {event} ON tasks {TRIGGERS[event]} '
+            'FOR EACH STATEMENT EXECUTE FUNCTION task_tags_sync_primary()'
+        )
+
+    # Adding or removing a tag of a task changes the user's task listings (see users.data_version)
+    for event, referencing in TRIGGERS.items():
+        op.execute(
+            f'CREATE TRIGGER task_tags_data_version_{event.lower()} AFTER {event} ON task_tags {referencing} '
+            'FOR EACH STATEMENT EXECUTE FUNCTION users_bump_data_version()'
+        )
+
+    # Writes to tasks wait until the migration commits, so the backfill and the triggers agree
+    op.execute('LOCK TABLE tasks IN SHARE MODE')
+    op.execute("""
+        INSERT INTO task_tags (user_id, tag_id, task_id)
+        SELECT user_id, tag_id, task_id FROM tasks WHERE tag_id IS NOT NULL
+        ON CONFLICT DO NOTHING
+    """)
+
+
+def downgrade() -> None:
+    for event in TRIGGERS:
+        op.execute(f'DROP TRIGGER IF EXISTS task_tags_data_version_{event.lower()} ON task_tags')
+
+    for event in ('INSERT', 'UPDATE'):
+        op.execute(f'DROP TRIGGER IF EXISTS task_tags_sync_{event.lower()} ON tasks')
+
+    op.execute('DROP FUNCTION IF EXISTS task_tags_sync_primary()')
+    op.drop_index('ix_task_tags_task_id_tag_id', table_name='task_tags')
+    op.drop_table('task_tags')
@@ -0,0 +1,95 @@
+"""task_counters maintained by triggers
+
+Revision ID: c4a9e2d7b815
+Revises: 8d3b6f1a7e42
+Create Date: 2026-10-18 14:52:06.713904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4a9e2d7b815'
+down_revision: Union[str, None] = '8d3b6f1a7e42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (dimension, value) pairs counted for a task row, keep in sync with TaskCounter in backend/app/schemas.py
+DIMENSIONS = """(VALUES ('total', 'all'), ('status', status::text), ('priority', priority::text), ('tag', tag))"""
+
+# Statement level triggers see every changed row at once through the transition tables, so a bulk
+# statement (batch, import, overdue sweeper) costs one counters update per (user, dimension, value)
+# and not one per task. Decrements never insert, a user being deleted has no counters left to fix.
+APPLY_FUNCTION = f"""
+CREATE FUNCTION task_counters_apply() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE task_counters AS c
+        SET count = c.count - d.count
+        FROM (
+            SELECT old_rows.user_id, d.dimension, d.value, count(*) AS count
+            FROM old_rows, LATERAL {DIMENSIONS} AS d (dimension, value)
+            WHERE d.value IS NOT NULL
+            GROUP BY 1, 2, 3
+        ) AS d
+        WHERE c.user_id = d.user_id AND c.dimension = d.dimension AND c.value = d.value;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO task_counters (user_id, dimension, value, count)
+        SELECT new_rows.user_id, d.dimension, d.value, count(*)
+        FROM new_rows, LATERAL {DIMENSIONS} AS d (dimension, value)
+        WHERE d.value IS NOT NULL
+        GROUP BY 1, 2, 3
+        ON CONFLICT (user_id, dimension, value) DO UPDATE SET count = task_counters.count + EXCLUDED.count;
+    END IF;
+
+    RETURN NULL;
+END
+$$
+"""
+
+TRIGGERS = {
+    'INSERT': 'REFERENCING NEW TABLE AS new_rows',
+    'UPDATE': 'REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows',
+    'DELETE': 'REFERENCING OLD TABLE AS old_rows',
+}
+
+
+def upgrade() -> None:
+    op.create_table('task_counters',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('dimension', sa.String(length=16), nullable=False),
+    sa.Column('value', sa.String(length=255), nullable=False),
+    sa.Column('count', sa.Integer(), server_default='0', nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.user_id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'dimension', 'value')
+    )
+
+    op.execute(APPLY_FUNCTION)
+    for event, referencing in TRIGGERS.items():
+        op.execute(
+            f'CREATE TRIGGER task_counters_{event.lower()} AFTER {event} ON tasks {referencing} '
+            'FOR EACH STATEMENT EXECUTE FUNCTION task_counters_apply()'
+        )
+
+    # Writes to tasks wait until the migration commits, so the backfill and the triggers agree
+    op.execute('LOCK TABLE tasks IN SHARE MODE')
+    op.execute(f"""
+        INSERT INTO task_counters (user_id, dimension, value, count)
+        SELECT tasks.user_id, d.dimension, d.value, count(*)
+        FROM tasks, LATERAL {DIMENSIONS} AS d (dimension, value)
+        WHERE d.value IS NOT NULL
+        GROUP BY 1, 2, 3
+    """)
+
+
+def downgrade() -> None:
+    for event in TRIGGERS:
+        op.execute(f'DROP TRIGGER IF EXISTS task_counters_{event.lower()} ON tasks')
+
+    op.execute('DROP FUNCTION IF EXISTS task_counters_apply()')
+    op.drop_table('task_counters')
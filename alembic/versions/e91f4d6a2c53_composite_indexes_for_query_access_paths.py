@@ -0,0 +1,53 @@
+"""composite indexes for query access paths
+
+Revision ID: e91f4d6a2c53
+Revises: b5d2e8c41f07
+Create Date: 2026-10-18 12:26:08.350147
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e91f4d6a2c53'
+down_revision: Union[str, None] = 'b5d2e8c41f07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (index name, table, columns), see __table_args__ in backend/app/schemas.py
+INDEXES = [
+    ('ix_tasks_user_id_task_id', 'tasks', ['user_id', 'task_id']),
+    ('ix_tasks_user_id_status_task_id', 'tasks', ['user_id', 'status', 'task_id']),
+    ('ix_tasks_user_id_priority_task_id', 'tasks', ['user_id', 'priority', 'task_id']),
+    ('ix_tasks_user_id_tag_task_id', 'tasks', ['user_id', 'tag', 'task_id']),
+    ('ix_tasks_user_id_due_date_task_id', 'tasks', ['user_id', 'due_date', 'task_id']),
+    ('ix_tasks_user_id_title_task_id', 'tasks', ['user_id', 'title', 'task_id']),
+    ('ix_tasks_tag_id_task_id', 'tasks', ['tag_id', 'task_id']),
+    ('ix_users_updated_at', 'users', ['updated_at']),
+]
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction, so every statement gets its own
+    # autocommit block and the tables stay writable while the indexes build.
+    # If a build fails, Postgres leaves an INVALID index behind, drop it and rerun the upgrade.
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, unique=False, postgresql_concurrently=True, if_not_exists=True)
+
+        # Build the unique index online, then attach it as the constraint (a brief lock only).
+        # This fails if a user already has duplicate tags, which add_tag never allowed.
+        op.create_index(
+            'uq_tags_user_id_tag', 'tags', ['user_id', 'tag'], unique=True,
+            postgresql_concurrently=True, if_not_exists=True
+        )
+        op.execute('ALTER TABLE tags ADD CONSTRAINT uq_tags_user_id_tag UNIQUE USING INDEX uq_tags_user_id_tag')
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_tags_user_id_tag', 'tags', type_='unique')
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,116 @@
+"""task_counters by tag from task_tags
+
+Revision ID: f2b8d4a6c391
+Revises: a7c3d5e9f120
+Create Date: 2026-10-19 09:14:37.528106
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2b8d4a6c391'
+down_revision: Union[str, None] = 'a7c3d5e9f120'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# A task can have several tags, so the tag dimension is now counted from task_tags. It is keyed by
+# tag_id (as text): a renamed tag keeps its count, and the cascade from a deleted tag can still
+# decrement it. The tasks triggers keep counting the other dimensions.
+TASK_DIMENSIONS = """(VALUES ('total', 'all'), ('status', status::text), ('priority', priority::text))"""
+PREVIOUS_TASK_DIMENSIONS = """(VALUES ('total', 'all'), ('status', status::text), ('priority', priority::text), ('tag', tag))"""
+
+APPLY_FUNCTION = """
+CREATE OR REPLACE FUNCTION task_counters_apply() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE task_counters AS c
+        SET count = c.count - d.count
+        FROM (
+            SELECT old_rows.user_id, d.dimension, d.value, count(*) AS count
+            FROM old_rows, LATERAL {dimensions} AS d (dimension, value)
+            WHERE d.value IS NOT NULL
+            GROUP BY 1, 2, 3
+        ) AS d
+        WHERE c.user_id = d.user_id AND c.dimension = d.dimension AND c.value = d.value;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO task_counters (user_id, dimension, value, count)
+        SELECT new_rows.user_id, d.dimension, d.value, count(*)
+        FROM new_rows, LATERAL {dimensions} AS d (dimension, value)
+        WHERE d.value IS NOT NULL
+        GROUP BY 1, 2, 3
+        ON CONFLICT (user_id, dimension, value) DO UPDATE SET count = task_counters.count + EXCLUDED.count;
+    END IF;
+
+    RETURN NULL;
+END
+$$
+"""
+
+APPLY_TAGS_FUNCTION = """
+CREATE FUNCTION task_counters_apply_tags() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE task_counters AS c
+        SET count = c.count - d.count
+        FROM (
+            SELECT user_id, tag_id::text AS value, count(*) AS count FROM old_rows GROUP BY 1, 2
+        ) AS d
+        WHERE c.user_id = d.user_id AND c.dimension = 'tag' AND c.value = d.value;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO task_counters (user_id, dimension, value, count)
+        SELECT user_id, 'tag', tag_id::text, count(*) FROM new_rows GROUP BY 1, 3
+        ON CONFLICT (user_id, dimension, value) DO UPDATE SET count = task_counters.count + EXCLUDED.count;
+    END IF;
+
+    RETURN NULL;
+END
+$$
+"""
+
+TRIGGERS = {
+    'INSERT': 'REFERENCING NEW TABLE AS new_rows',
+    'UPDATE': 'REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows',
+    'DELETE': 'REFERENCING OLD TABLE AS old_rows',
+}
+
+
+def upgrade() -> None:
+    # Writes to tasks and task_tags wait until the migration commits, so the backfill and the triggers agree
+    op.execute('LOCK TABLE tasks, task_tags IN SHARE MODE')
+
+    op.execute(APPLY_FUNCTION.format(dimensions=TASK_DIMENSIONS))
+    op.execute(APPLY_TAGS_FUNCTION)
+    for event, referencing in TRIGGERS.items():
+        op.execute(
+            f'CREATE TRIGGER task_counters_tags_{event.lower()} AFTER {event} ON task_tags {referencing} '
+            'FOR EACH STATEMENT EXECUTE FUNCTION task_counters_apply_tags()'
+        )
+
+    op.execute("DELETE FROM task_counters WHERE dimension = 'tag'")
+    op.execute("""
+        INSERT INTO task_counters (user_id, dimension, value, count)
+        SELECT user_id, 'tag', tag_id::text, count(*) FROM task_tags GROUP BY 1, 3
+    """)
+
+
+def downgrade() -> None:
+    op.execute('LOCK TABLE tasks, task_tags IN SHARE MODE')
+
+    for event in TRIGGERS:
+        op.execute(f'DROP TRIGGER IF EXISTS task_counters_tags_{event.lower()} ON task_tags')
+
+    op.execute('DROP FUNCTION IF EXISTS task_counters_apply_tags()')
+    op.execute(APPLY_FUNCTION.format(dimensions=PREVIOUS_TASK_DIMENSIONS))
+
+    op.execute("DELETE FROM task_counters WHERE dimension = 'tag'")
+    op.execute("""
+        INSERT INTO task_counters (user_id, dimension, value, count)
+        SELECT user_id, 'tag', tag, count(*) FROM tasks WHERE tag IS NOT NULL GROUP BY 1, 3
+    """)
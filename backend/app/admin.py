@@ -3,22 +3,23 @@ from datetime import datetime
 
 # Third-Party Imports
 from fastapi import Depends, HTTPException, APIRouter
+from sqlalchemy.ext.asyncio import AsyncSession
 
 # Local Imports
-from backend.auth_utils import get_current_admin, only_admin
+from backend.app.utils import get_session
+from backend.app.pagination import Page, get_page, page_response
+from backend.auth_utils import get_current_admin, Principal
 from backend.app.database import UserData
-from backend.app.schemas import Admin
-from backend.app.models import UserResponse, UsersResponse
+from backend.app.models import UserResponse, UsersResponse, TaskStatsResponse
 
 router = APIRouter()
 
 # API Endpoints accessible only to admins
 @router.get("/{user_id}", response_model=UserResponse, status_code=200)
-@only_admin
-async def get_user(user_id: int, current_admin: Admin = Depends(get_current_admin)):
+async def get_user(user_id: int, current_admin: Principal = Depends(get_current_admin), session: AsyncSession = Depends(get_session, scope="function")):
     """Retrieves a specific user from the database"""
     try:
-        user = UserData().get_user(user_id=user_id)
+        user = await UserData(session).get_user(user_id=user_id)
         return UserResponse(**user.__dict__)
     
     except AttributeError as e:
@@ -26,33 +27,43 @@ async def get_user(user_id: int, current_admin: Admin = Depends(get_current_admi
 
 
 @router.get("/all/", response_model=UsersResponse, status_code=200)
-@only_admin
-async def get_all_users(current_admin: Admin = Depends(get_current_admin)):
-    """Retrieves all users from the database"""
-    users = UserData().get_all_users()
-    if not users:
-        return UsersResponse(user_count=0, users=[])
-    users = [UserResponse(**user.__dict__) for user in users]
-    return UsersResponse(user_count=len(users), users=users)
+async def get_all_users(page: Page = Depends(get_page), current_admin: Principal = Depends(get_current_admin), session: AsyncSession = Depends(get_session, scope="function")):
+    """Retrieves a page of users from the database"""
+    response = await UserData(session).get_all_users(page=page)
+    if "error" in response:
+        raise HTTPException(status_code=response["status_code"], detail=response["error"])
+
+    return page_response(
+        response["rows"], "user_count", "users", list(UserResponse.model_fields), next_cursor=response["next_cursor"]
+    )
     
 
 @router.get("/recently_active/", response_model=UsersResponse, status_code=200)
-@only_admin
-async def get_recently_active_users(updated_at: datetime, current_admin: Admin = Depends(get_current_admin)):
-    """Retrieves all users those have been active recently"""
-    users = UserData().get_recently_active_users(updated_at=updated_at)
-    if not users:
-        return UsersResponse(user_count=0, users=[])
-    users = [UserResponse(**user.__dict__) for user in users]
-    return UsersResponse(user_count=len(users), users=users)
-    
+async def get_recently_active_users(updated_at: datetime, page: Page = Depends(get_page), current_admin: Principal = Depends(get_current_admin), session: AsyncSession = Depends(get_session, scope="function")):
+    """Retrieves a page of users those have been active recently, most recent first"""
+    response = await UserData(session).get_recently_active_users(updated_at=updated_at, page=page)
+    if "error" in response:
+        raise HTTPException(status_code=response["status_code"], detail=response["error"])
+
+    return page_response(
+        response["rows"], "user_count", "users", list(UserResponse.model_fields), next_cursor=response["next_cursor"]
+    )
+
+
+@router.get("/stats/", response_model=TaskStatsResponse, status_code=200)
+async def get_task_stats(page: Page = Depends(get_page), current_admin: Principal = Depends(get_current_admin), session: AsyncSession = Depends(get_session, scope="function")):
+    """Retrieves the task counts by status and priority of all users, and of a page of users"""
+    response = await UserData(session).get_task_stats(page=page)
+    if "error" in response:
+        raise HTTPException(status_code=response["status_code"], detail=response["error"])
+
+    return TaskStatsResponse(totals=response["totals"], users=response["rows"], next_cursor=response["next_cursor"])
 
 
 @router.delete("/{user_id}", status_code=200)
-@only_admin
-async def delete_user(user_id: int, current_admin: Admin = Depends(get_current_admin)):
+async def delete_user(user_id: int, current_admin: Principal = Depends(get_current_admin), session: AsyncSession = Depends(get_session, scope="function")):
     """Deletes users from the database as an admin"""
-    response = UserData().delete_user(user_id=user_id)
+    response = await UserData(session).delete_user(user_id=user_id)
     if "error" in response:
         raise HTTPException(status_code=response["status_code"], detail=response["error"])
     
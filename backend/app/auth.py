@@ -1,23 +1,25 @@
 # Third-Party Imports
 from fastapi import APIRouter, HTTPException, Depends
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.ext.asyncio import AsyncSession
 
 # Local Imports
-from backend.app.database import AdminData, UserData, TokenData, TaskData
-from backend.auth_utils import get_current_user, generate_token, raise_exception
+from backend.app.utils import get_session
+from backend.app.database import AdminData, UserData, TokenData
+from backend.auth_utils import get_current_user, generate_token, token_expiry, ADMIN_ROLE, USER_ROLE
 from backend.app.models import UpdateUserRequest
 
 router = APIRouter()
 
 @router.post("/register", status_code=201)
-async def register_user(username: str, password: str):
+async def register_user(username: str, password: str, session: AsyncSession = Depends(get_session, scope="function")):
     """Register a new if the user doesn't already exist"""
 
     # Don't allow to register a new user if the creds match with an admin
-    if AdminData().is_admin(username=username, password=password):
+    if await AdminData(session).is_admin(username=username, password=password):
         return {"error": "User already exists", "status_code": 409}
     
-    response = UserData().add_user(username=username, password=password) # Password hasing is taken care of
+    response = await UserData(session).add_user(username=username, password=password) # Password hasing is taken care of
     if "error" in response:
         raise HTTPException(status_code=response["status_code"], detail=response["error"])
     
@@ -25,18 +27,19 @@ async def register_user(username: str, password: str):
 
 
 @router.post("/login", status_code=200)
-async def login(form_data: OAuth2PasswordRequestForm = Depends()):  
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), session: AsyncSession = Depends(get_session, scope="function")):  
     """Returns a JWT token if the user is authenticated"""
     username = form_data.username
     password = form_data.password
-    
-    token = generate_token(username=username)
 
-    if AdminData().is_admin(username=username, password=password):
+    if admin := await AdminData(session).is_admin(username=username, password=password):
+        token = generate_token(username=username, user_id=admin.admin_id, role=ADMIN_ROLE)
         return {"access_token": token, "token_type": "bearer"}
         
-    elif UserData().is_user(username=username, password=password):
-        TaskData().auto_update_task_status_to_overdue()
+    elif user := await UserData(session).is_user(username=username, password=password):
+        token = generate_token(
+            username=username, user_id=user.user_id, role=USER_ROLE, token_version=user.token_version
+        )
         return {"access_token": token, "token_type": "bearer"}
 
     else:
@@ -44,11 +47,9 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
 
 
 @router.patch("/update", status_code=200)
-@raise_exception
-async def update_user(request: UpdateUserRequest, current_user: dict=Depends(get_current_user)):
-    """Updates the username or password of the current user"""
-    response = UserData().update_user(user_id=current_user["user"].user_id, new_username=request.new_username, new_password=request.new_password)
-    TokenData().revoke_token(current_user["token"])
+async def update_user(request: UpdateUserRequest, current_user: dict=Depends(get_current_user), session: AsyncSession = Depends(get_session, scope="function")):
+    """Updates the username or password of the current user, every issued token stops working"""
+    response = await UserData(session).update_user(user_id=current_user["user"].user_id, new_username=request.new_username, new_password=request.new_password)
     if "error" in response:
         raise HTTPException(status_code=response["status_code"], detail=response["error"])
     
@@ -56,18 +57,25 @@ async def update_user(request: UpdateUserRequest, current_user: dict=Depends(get
 
 
 @router.post("/logout", status_code=200)
-@raise_exception
-async def logout(current_user: dict=Depends(get_current_user)):
+async def logout(current_user: dict=Depends(get_current_user), session: AsyncSession = Depends(get_session, scope="function")):
     """Revokes the JWT token for the current user"""
-    TokenData().revoke_token(current_user["token"])
+    await TokenData(session).revoke_token(
+        jti=current_user["claims"]["jti"], expires_at=token_expiry(current_user["claims"])
+    )
     return {"message": "Logout successful", "status_code": 200}
 
 
+@router.post("/logout_all", status_code=200)
+async def logout_all(current_user: dict=Depends(get_current_user), session: AsyncSession = Depends(get_session, scope="function")):
+    """Invalidates every JWT token issued to the current user by bumping the token version"""
+    await UserData(session).bump_token_version(user_id=current_user["user"].user_id)
+    return {"message": "Logged out from all sessions", "status_code": 200}
+
+
 @router.delete("/delete", status_code=200)
-@raise_exception
-async def delete_user(current_user: dict=Depends(get_current_user)):
+async def delete_user(current_user: dict=Depends(get_current_user), session: AsyncSession = Depends(get_session, scope="function")):
     """Deletes user and all associated data from the database"""
-    response = UserData().delete_user(user_id=current_user["user"].user_id)
+    response = await UserData(session).delete_user(user_id=current_user["user"].user_id)
     if "error" in response:
         raise HTTPException(status_code=response["status_code"], detail=response["error"])
     
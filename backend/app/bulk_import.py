@@ -0,0 +1,94 @@
+# Standard Imports
+import io
+import csv
+import json
+from itertools import islice
+from typing import AsyncIterator, Iterator, Tuple
+
+# Third-Party Imports
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+
+# Local Imports
+from config_file import IMPORT_MAX_ERRORS, IMPORT_READ_BATCH
+from backend.app.models import ImportTaskRow
+from backend.app.schemas import TaskPriority, TaskStatus
+
+
+class TaskImport:
+    """
+    Reads an uploaded NDJSON or CSV task file one row at a time, validates every row against
+    ImportTaskRow and hands the valid ones to COPY as records. Rejected rows are counted, and the
+    first IMPORT_MAX_ERRORS of them are kept with their line number and reason.
+    """
+    def __init__(self, file, import_format: str):
+        self.file = file
+        self.import_format = import_format
+        self.failed = 0
+        self.errors = []
+
+    def reject(self, line: int, error: str) -> None:
+        self.failed += 1
+        if len(self.errors) < IMPORT_MAX_ERRORS:
+            self.errors.append({"line": line, "error": error})
+
+    def _rows(self) -> Iterator[Tuple[int, object]]:
+        # utf-8-sig drops the BOM that spreadsheet exports like to add
+        text = io.TextIOWrapper(self.file, encoding="utf-8-sig", newline="")
+        if self.import_format == "csv":
+            reader = csv.DictReader(text)
+            for row in reader:
+                # Empty cells are missing values, columns without a header are ignored
+                yield reader.line_num, {key: value for key, value in row.items() if key and value != ""}
+
+        else:
+            for line, raw in enumerate(text, start=1):
+                if not raw.strip():
+                    continue
+
+                try:
+                    yield line, json.loads(raw)
+
+                except json.JSONDecodeError as e:
+                    self.reject(line, f"Invalid JSON - {e}")
+
+        text.detach()
+
+    async def _row_batches(self) -> AsyncIterator[list]:
+        # The upload is a spooled file that may be on disk, so reading and parsing runs on the
+        # thread pool, IMPORT_READ_BATCH rows at a time
+        rows = self._rows()
+        while batch := await run_in_threadpool(lambda: list(islice(rows, IMPORT_READ_BATCH))):
+            yield batch
+
+    async def records(self) -> AsyncIterator[tuple]:
+        """Yields (line, title, description, tag, due_date, priority, status) for every valid row"""
+        async for batch in self._row_batches():
+            for line, row in batch:
+                try:
+                    task = ImportTaskRow.model_validate(row)
+
+                except ValidationError as e:
+                    self.reject(line, "; ".join(
+                        f"{'.'.join(str(part) for part in error['loc']) or 'row'}: {error['msg']}" for error in e.errors()
+                    ))
+                    continue
+
+                yield (
+                    line, task.title, task.description or None, task.tag or None, task.due_date,
+                    (task.priority or TaskPriority.Medium).value, (task.status or TaskStatus.Pending).value
+                )
+
+    def report(self, user_id: int, response: dict) -> dict:
+        """Merges the rows rejected while reading with the rows the db skipped for an unknown tag"""
+        errors = self.errors + [
+            {"line": line, "error": f"Tag:{tag} doesn't exist for User:{user_id}"}
+            for line, tag in response["unknown_tags"]
+        ]
+        errors.sort(key=lambda error: error["line"])
+
+        return {
+            "imported": response["imported"],
+            "failed": self.failed + response["skipped"],
+            "errors": errors[:IMPORT_MAX_ERRORS]
+        }
@@ -0,0 +1,138 @@
+# Standard Imports
+import math
+import time
+import hashlib
+from typing import Dict, Iterable, Optional, Tuple
+
+# Local Imports
+from config_file import (
+    REVOCATION_BLOOM_CAPACITY, REVOCATION_BLOOM_ERROR_RATE, TOKEN_VERSION_CACHE_SECONDS, TOKEN_VERSION_CACHE_SIZE
+)
+
+
+class BloomFilter:
+    """Fixed size Bloom filter over strings, answers 'definitely absent' or 'maybe present'"""
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = max(capacity, 1)
+        self.size = math.ceil(-self.capacity * math.log(error_rate) / (math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray(math.ceil(self.size / 8))
+        self.count = 0
+
+    def _positions(self, key: str):
+        # Double hashing, k positions out of two 64 bit halves of a single digest
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, key: str) -> None:
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class RevocationCache:
+    """
+    Process local view of the revoked_tokens table used in the auth hot path.
+    Keys are the `jti` claims of revoked tokens. A Bloom filter answers the common 'not revoked'
+    case without touching the db, and an exact map of jti -> JWT exp confirms the positives.
+    Entries are evicted once the token expires, as an expired token is rejected by jwt.decode
+    before the revocation check anyway.
+    """
+    def __init__(self, capacity: int = REVOCATION_BLOOM_CAPACITY, error_rate: float = REVOCATION_BLOOM_ERROR_RATE):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.warm = False
+        self._expiry: Dict[str, float] = {}
+        self._bloom = BloomFilter(capacity, error_rate)
+
+    def add(self, jti: str, expires_at: float) -> None:
+        """Marks a token as revoked until it expires (expires_at is a unix timestamp)"""
+        if expires_at <= time.time():
+            return
+
+        self._expiry[jti] = expires_at
+        if self._bloom.count >= self._bloom.capacity:
+            self._rebuild()
+        else:
+            self._bloom.add(jti)
+
+    def is_revoked(self, jti: str) -> Optional[bool]:
+        """
+        Returns True/False when the cache can answer on its own and None when the caller has to
+        ask the db (cache not warmed yet, or a Bloom filter false positive)
+        """
+        if not self.warm:
+            return None
+
+        if jti not in self._bloom:
+            return False
+
+        expires_at = self._expiry.get(jti)
+        if expires_at is None:
+            return None
+
+        if expires_at <= time.time():
+            del self._expiry[jti]
+            return False
+
+        return True
+
+    def merge(self, entries: Iterable[Tuple[str, float]]) -> None:
+        """
+        Adds (jti, expires_at) entries loaded from the db to the cache. Entries already cached are
+        kept, as a snapshot read before a revocation in this process committed doesn't have it yet.
+        """
+        self._expiry.update(entries)
+        self._rebuild()
+        self.warm = True
+
+    def _rebuild(self) -> None:
+        # Drops expired entries and resizes the filter, Bloom filters can't delete in place
+        now = time.time()
+        self._expiry = {jti: expires_at for jti, expires_at in self._expiry.items() if expires_at > now}
+        capacity = max(self.capacity, 2 * len(self._expiry))
+        self._bloom = BloomFilter(capacity, self.error_rate)
+        for jti in self._expiry:
+            self._bloom.add(jti)
+
+
+class TokenVersionCache:
+    """
+    Small user_id -> token_version map with a TTL, checked against the `ver` claim of user tokens.
+    Bumps made in this process are applied immediately, bumps made by other workers are seen
+    once the entry expires, i.e. within `ttl` seconds.
+    """
+    def __init__(self, ttl: float = TOKEN_VERSION_CACHE_SECONDS, max_size: int = TOKEN_VERSION_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._versions: Dict[int, Tuple[Optional[int], float]] = {}
+
+    def get(self, user_id: int) -> Tuple[bool, Optional[int]]:
+        """
+        Returns (hit, version). A miss or stale entry is (False, None), a cached deleted user is
+        (True, None) so the caller can reject it without asking the db again.
+        """
+        entry = self._versions.get(user_id)
+        if entry is None or entry[1] <= time.monotonic():
+            return False, None
+
+        return True, entry[0]
+
+    def set(self, user_id: int, version: Optional[int]) -> None:
+        """Caches the version of a user, None marks a deleted user"""
+        if len(self._versions) >= self.max_size:
+            now = time.monotonic()
+            self._versions = {key: entry for key, entry in self._versions.items() if entry[1] > now}
+            if len(self._versions) >= self.max_size:
+                self._versions.clear()
+
+        self._versions[user_id] = (version, time.monotonic() + self.ttl)
+
+
+REVOKED_TOKENS = RevocationCache()
+TOKEN_VERSIONS = TokenVersionCache()
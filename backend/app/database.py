@@ -1,384 +1,889 @@
 # Standard Imports
-from typing import Union, List
+from typing import Union, List, AsyncIterator, AsyncIterable
 from datetime import datetime, date
 
+# Third-Party Imports
+from sqlalchemy import (
+    Integer, String, select, insert, delete, update, values, column, func, cast, literal, literal_column, and_, or_, any_
+)
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
 # Local Imports
-from config_file import DB_URL
-from backend.app.utils import SessionManager, hash_password
-from backend.app.schemas import Admin, User, Tag, Task, RevokedToken, User, TaskStatus, TaskPriority
+from backend.app.utils import hash_password, verify_password, verify_dummy_password, needs_rehash
+from backend.app.cache import REVOKED_TOKENS, TOKEN_VERSIONS
+from backend.app.pagination import Page, paginate
+from backend.app.schemas import (
+    Admin, User, Tag, Task, TaskTag, TaskCounter, RevokedToken, User, TaskStatus, TaskPriority, TASK_SEARCH_CONFIG, TASK_SEARCH_TEXT,
+    task_import
+)
+
+# Columns of a task response (the TaskResponse fields), selected as plain rows instead of Task objects
+TASK_LIST_COLUMNS = [
+    Task.user_id, Task.task_id, Task.title, Task.description, Task.tag_id, Task.tag, Task.due_date,
+    Task.priority, Task.status
+]
+
+# Same expression as the trigram index on tasks, so that the planner can match it
+TASK_SEARCH_TEXT_COLUMN = literal_column(TASK_SEARCH_TEXT)
+
+
+def task_search_query(text: str):
+    """Parses the user's search text into a tsquery (quotes, OR and -word are supported, never a syntax error)"""
+    return func.websearch_to_tsquery(literal_column(f"'{TASK_SEARCH_CONFIG}'::regconfig"), text)
+
+
+def task_text_match(text: str):
+    """Matches tasks whose words match the text (GIN on search_vector) or that contain it (trigram GIN)"""
+    pattern = "%" + text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+    return or_(Task.search_vector.op("@@")(task_search_query(text)), TASK_SEARCH_TEXT_COLUMN.ilike(pattern))
+
+
+def task_count_columns() -> list:
+    """Aggregate columns counting tasks in total, by status and by priority (COUNT ... FILTER)"""
+    return [
+        func.count(Task.task_id).label("task_count"),
+        *[func.count(Task.task_id).filter(Task.status == status).label(f"status_{status.value}") for status in TaskStatus],
+        *[
+            func.count(Task.task_id).filter(Task.priority == priority).label(f"priority_{priority.value}")
+            for priority in TaskPriority
+        ]
+    ]
+
+
+def task_counts(row) -> dict:
+    """Shapes a row of task_count_columns as {"task_count", "by_status", "by_priority"}"""
+    return {
+        "task_count": row["task_count"],
+        "by_status": {status.value: row[f"status_{status.value}"] for status in TaskStatus},
+        "by_priority": {priority.value: row[f"priority_{priority.value}"] for priority in TaskPriority}
+    }
+
+
+class BaseData:
+    """
+    Base class for the data classes below. Every instance works on the session it is given,
+    normally the request scoped session from `get_session`, so all the reads and writes of a
+    request share one transaction. Writes are only flushed, the owner of the session commits
+    (release_connection is the one exception, for the password methods).
+    """
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def release_connection(self) -> None:
+        """
+        Ends the transaction so far and returns its connection to the pool before slow work that
+        doesn't need the db (bcrypt), so the connection doesn't sit idle in transaction meanwhile.
+        Only called by the password methods, before their writes: the request has nothing
+        else to commit at that point. The next statement starts a new short transaction.
+        """
+        if self.session.in_transaction():
+            await self.session.commit()
 
 
-class AdminData:
+class AdminData(BaseData):
     """Class to read and write data from/to the admins table"""
-    def get_admin(self, username: str) -> Admin:
+    async def get_admin(self, username: str) -> Admin:
         """Read and return data from the admins db filter by username"""
-        with SessionManager(db_url=DB_URL) as session:
-            admin = session.query(Admin).filter_by(username=username).first()
+        admin = await self.session.scalar(select(Admin).filter_by(username=username))
         return admin
-    
-    def is_admin(self, username: str, password: str) -> bool:
-        """Check if the user is an admin and return True or False"""
-        admin = self.get_admin(username=username)
-    
+
+    async def is_admin(self, username: str, password: str) -> Admin:
+        """Check if the user is an admin and return the admin, or None"""
+        admin = await self.get_admin(username=username)
+
         if admin and admin.password == password:
-            return True
+            return admin
 
-        return False
+        return None
 
 
-class UserData:
+class UserData(BaseData):
     """Class to read and write data from/to the users table"""
-    def get_user(self, user_id: int=None, username: str=None) -> User:
+    async def get_user(self, user_id: int=None, username: str=None) -> User:
         """Read and return data from the db filter by user_id or username"""
-        with SessionManager(db_url=DB_URL) as session:
-            if user_id:
-                user = session.query(User).filter_by(user_id=user_id).first()
+        if user_id:
+            user = await self.session.scalar(select(User).filter_by(user_id=user_id))
+
+        if username:
+            user = await self.session.scalar(select(User).filter_by(username=username))
+
+        return user
+
+    async def is_user(self, username: str, password: str) -> User:
+        """
+        Check if the user exists and return the user, or None.
+        A legacy or outdated hash is replaced with a bcrypt hash of the configured cost on success.
+        """
+        user = await self.get_user(username=username)
+        await self.release_connection()
+        if not user:
+            # As slow as a wrong password, the response time doesn't tell whether the username exists
+            await verify_dummy_password(password)
+            return None
+
+        if await verify_password(password, user.password_hash):
+            if needs_rehash(user.password_hash):
+                # Written in a new short transaction, committed with the request
+                user.password_hash = await hash_password(password)
+                await self.session.flush()
 
-            if username:
-                user = session.query(User).filter_by(username=username).first()
-            
             return user
-    
-    def is_user(self, username: str, password: str) -> bool:
-        """Check if the user exists and return True or False"""
-        user = self.get_user(username=username)
-        if user and user.password_hash == hash_password(password):
-            return True
-
-        return False
-    
-    def add_user(self, username: str, password: str) -> dict:
+
+        return None
+
+    async def get_token_version(self, user_id: int) -> int:
+        """Returns the token_version of a user, or None if the user doesn't exist"""
+        return await self.session.scalar(select(User.token_version).filter_by(user_id=user_id))
+
+    async def get_data_version(self, user_id: int) -> int:
+        """Returns the data_version of a user (see the ETag of the read endpoints), or None"""
+        return await self.session.scalar(select(User.data_version).filter_by(user_id=user_id))
+
+    async def bump_token_version(self, user_id: int) -> int:
+        """Invalidates every token issued to a user so far and returns the new token_version"""
+        token_version = await self.session.scalar(
+            update(User)
+            .where(User.user_id == user_id)
+            .values(token_version=User.token_version + 1)
+            .returning(User.token_version)
+            .execution_options(synchronize_session=False)
+        )
+        TOKEN_VERSIONS.set(user_id, token_version)
+        return token_version
+
+    async def add_user(self, username: str, password: str) -> dict:
         """Adds new user to the db if the user doesn't already exist"""
-        user = self.get_user(username=username)
+        # Hashed before any statement of this method, without holding a connection
+        await self.release_connection()
+        password_hash = await hash_password(password)
+
+        user = await self.get_user(username=username)
         if user:
             return {"error": "User already exists", "status_code": 409}
 
-        password_hash = hash_password(password)
         try:
-            with SessionManager(db_url=DB_URL) as session:
-                new_user = User(username=username, password_hash=password_hash)
-                session.add(new_user)
-                session.commit()
+            new_user = User(username=username, password_hash=password_hash)
+            self.session.add(new_user)
+            await self.session.flush()
 
             return {"message": "User added successfully", "status_code": 201}
-        
+
         except Exception as e:
             return {"error": f"Error adding new user - {e}", "status_code": 400}
 
-    def update_user(self, user_id: int, new_username: str=None, new_password: str=None) -> dict:
+    async def update_user(self, user_id: int, new_username: str=None, new_password: str=None) -> dict:
         """Updates the user with the new username or/and new password if the user exists"""
-        user = self.get_user(user_id=user_id)
+        # Hashed before any statement of this method, without holding a connection
+        new_password_hash = None
+        if new_password:
+            await self.release_connection()
+            new_password_hash = await hash_password(new_password)
+
+        user = await self.get_user(user_id=user_id)
         if not user:
             return {"error": "User doesn't exist", "status_code": 404}
-        
+
         try:
             if new_username:
                 user.username = new_username
-            
-            if new_password:
-                new_password_hash = hash_password(new_password)
+
+            if new_password_hash:
                 user.password_hash = new_password_hash
-            
-            with SessionManager(db_url=DB_URL) as session:
-                session.merge(user)
-                session.commit()
-            
+
+            # Tokens issued with the old credentials stop working
+            user.token_version += 1
+
+            # user is still attached to the session, a flush is enough (no merge round trip)
+            await self.session.flush()
+            TOKEN_VERSIONS.set(user_id, user.token_version)
+
             return {"message": "User details updated successfully", "status_code": 200}
 
         except Exception as e:
             return {"error": f"Error updating user details - {e}", "status_code": 400}
-    
-    def delete_user(self, user_id: int) -> dict:
+
+    async def delete_user(self, user_id: int) -> dict:
         """Delete user from the database by user_id"""
-        user = self.get_user(user_id=user_id)
+        user = await self.get_user(user_id=user_id)
         if not user:
             return {"error": "User doesn't exist", "status_code": 404}
-        
+
         try:
-            with SessionManager(db_url=DB_URL) as session:
-                session.add(user)
-                session.delete(user)
-                session.commit()
+            # Tasks and tags are removed by the ON DELETE CASCADE foreign keys, a bulk delete
+            # avoids lazy loading user.tasks which AsyncSession cannot do implicitly
+            await self.session.execute(delete(User).where(User.user_id == user_id))
+            await self.session.flush()
+            TOKEN_VERSIONS.set(user_id, None)
 
             return {"message": "User deleted successfully", "status_code": 200}
-        
+
         except Exception as e:
             return {"error": f"Error deleting user - {e}", "status_code": 400}
-        
-    
-    def get_all_users(self) -> List[User]:
-        """Read and return all users from the users table as an admin"""
-        with SessionManager(db_url=DB_URL) as session:
-            users = session.query(User).all()
-            return users
-    
-    def get_recently_active_users(self, updated_at: datetime) -> List[User]:
-        """Read and return recently active users from the users table as an admin"""
-        with SessionManager(db_url=DB_URL) as session:
-            users = session.query(User).filter(User.updated_at > updated_at).all()
-            return users
-
-class TagData:
-    """Class to read and write data from/to the tags table"""   
-    def get_tag(self, user_id: int, tag: str=None) -> Tag:
+
+
+    async def get_all_users(self, page: Page) -> dict:
+        """Returns one page of users ordered by user_id, as an admin"""
+        return await paginate(
+            self.session, select(User.user_id, User.username), User.user_id, User.user_id, page, mappings=True
+        )
+
+    async def get_recently_active_users(self, updated_at: datetime, page: Page) -> dict:
+        """Returns one page of the users active after updated_at, most recently active first, as an admin"""
+        return await paginate(
+            self.session, select(User.user_id, User.username, User.updated_at).filter(User.updated_at > updated_at),
+            User.updated_at, User.user_id, page, descending=True, mappings=True
+        )
+
+    async def get_task_stats(self, page: Page) -> dict:
+        """
+        Returns the task counts by status and priority over all users, and one page of users with
+        their own counts, as an admin. Both are single GROUP BY queries, whatever the number of users.
+        """
+        totals = (await self.session.execute(
+            select(Task.status, Task.priority, func.count().label("task_count")).group_by(Task.status, Task.priority)
+        )).all()
+
+        statement = (
+            select(User.user_id, User.username, *task_count_columns())
+            .outerjoin(Task, Task.user_id == User.user_id)
+            .group_by(User.user_id)
+        )
+        response = await paginate(self.session, statement, User.user_id, User.user_id, page, mappings=True)
+        if "error" in response:
+            return response
+
+        response["totals"] = {
+            "task_count": sum(row.task_count for row in totals),
+            "by_status": {
+                status.value: sum(row.task_count for row in totals if row.status == status) for status in TaskStatus
+            },
+            "by_priority": {
+                priority.value: sum(row.task_count for row in totals if row.priority == priority)
+                for priority in TaskPriority
+            }
+        }
+        response["rows"] = [
+            {"user_id": row["user_id"], "username": row["username"], **task_counts(row)} for row in response["rows"]
+        ]
+        return response
+
+class TagData(BaseData):
+    """Class to read and write data from/to the tags table"""
+    async def get_tag(self, user_id: int, tag: str=None) -> Tag:
         """Returns tag object for a user filter by tag"""
-        with SessionManager(db_url=DB_URL) as session:
-            tag_ = session.query(Tag).filter_by(user_id=user_id, tag=tag).first()
-            return tag_
-    
-    def get_all_tags(self, user_id: int) -> List[Tag]:
-        """Returns all tags for a user"""
-        with SessionManager(db_url=DB_URL) as session:
-            tags = session.query(Tag).filter_by(user_id=user_id).all()
-            return tags
-    
-    def add_tag(self, user_id: int, tag: str) -> dict:
+        tag_ = await self.session.scalar(select(Tag).filter_by(user_id=user_id, tag=tag))
+        return tag_
+
+    async def get_all_tags(self, user_id: int, page: Page) -> dict:
+        """Returns one page of tags for a user ordered by (tag, tag_id)"""
+        return await paginate(
+            self.session, select(Tag.tag_id, Tag.tag).filter_by(user_id=user_id), Tag.tag, Tag.tag_id, page,
+            mappings=True
+        )
+
+    async def add_tag(self, user_id: int, tag: str) -> dict:
         """Adds new tag to the db for a user if the tag doesn't already exist"""
-        tag_= self.get_tag(user_id=user_id, tag=tag)
+        tag_= await self.get_tag(user_id=user_id, tag=tag)
         if tag_:
             return {"error": f"Tag:{tag} already exists for User:{user_id}", "status_code": 409}
 
         try:
-            with SessionManager(db_url=DB_URL) as session:
-                new_tag = Tag(user_id=user_id, tag=tag)
-                session.add(new_tag)
-                session.commit()
+            new_tag = Tag(user_id=user_id, tag=tag)
+            self.session.add(new_tag)
+            await self.session.flush()
 
             return {"message": "Tag added successfully", "status_code": 201}
-        
+
         except Exception as e:
             return {"error": f"Error adding new tag - {e}", "status_code": 400}
 
-    def update_tag(self, user_id: int, tag: str, new_tag: str=None) -> dict:
-        """Updates the tag with the new name if the tag exists"""
-        tag_ = self.get_tag(user_id=user_id, tag=tag)
+    async def update_tag(self, user_id: int, tag: str, new_tag: str=None) -> dict:
+        """
+        Renames the tag if it exists, along with the tag name copied into its tasks.
+        Both are single statements, the tasks are matched by tag_id whatever their number.
+        """
+        tag_ = await self.get_tag(user_id=user_id, tag=tag)
         if not tag_:
             return {"error": f"Tag:{tag} doesn't exist for User:{user_id}", "status_code": 404}
-        
+
+        if not new_tag or new_tag == tag:
+            return {"message": "Tag updated successfully", "status_code": 200}
+
+        if await self.get_tag(user_id=user_id, tag=new_tag):
+            return {"error": f"Tag:{new_tag} already exists for User:{user_id}", "status_code": 409}
+
         try:
-            if new_tag:
-                tag_.tag = new_tag
-            
-            with SessionManager(db_url=DB_URL) as session:
-                session.merge(tag_)
-                session.commit()
+            await self.session.execute(
+                update(Tag).where(Tag.tag_id == tag_.tag_id).values(tag=new_tag)
+                .execution_options(synchronize_session=False)
+            )
+            await self.session.execute(
+                update(Task).where(Task.user_id == user_id, Task.tag_id == tag_.tag_id).values(tag=new_tag)
+                .execution_options(synchronize_session=False)
+            )
 
             return {"message": "Tag updated successfully", "status_code": 200}
 
         except Exception as e:
             return {"error": f"Error updating tag - {e}", "status_code": 400}
-    
-    def delete_tag(self, user_id: int, tag: str) -> dict:
-        """Deletes a tag from the database for a user"""
-        tag_ = self.get_tag(user_id=user_id, tag=tag)
+
+    async def delete_tag(self, user_id: int, tag: str) -> dict:
+        """Deletes a tag from the database for a user and untags its tasks, with one statement each"""
+        tag_ = await self.get_tag(user_id=user_id, tag=tag)
         if not tag_:
             return {"error": f"Tag:{tag} doesn't exist for User:{user_id}", "status_code": 404}
-    
+
         try:
-            
-            # Delete tag from tags table for a user
-            with SessionManager(db_url=DB_URL) as session:
-                # print(session.identity_map.values()) # This will print all objects attached to the session
-                # session.expunge_all() # This will expunge all objects attached to the session
-                # session.merge(tag_) # Ideally we should merge(tag_) here, as tag_ is now attached to no session, but calling this thows an error
-                # Something terrible is happening here
-                session.add(tag_)
-                session.delete(tag_)
-            
-                # Delete tag from the tasks which uses the same tag for a user
-                tasks = TaskData().get_tasks_by_tag(user_id=user_id, tag=tag)
-                for task in tasks:
-                    session.add(task)
-                    task.tag = None
-                session.commit()
+            # Tasks first, the ON DELETE SET NULL of the tag would clear the tag_id they are matched by
+            await self.session.execute(
+                update(Task).where(Task.user_id == user_id, Task.tag_id == tag_.tag_id).values(tag_id=None, tag=None)
+                .execution_options(synchronize_session=False)
+            )
+            # Bulk delete, session.delete(tag_) would lazy load tag_.tasks which AsyncSession cannot do
+            await self.session.execute(delete(Tag).where(Tag.tag_id == tag_.tag_id))
 
             return {"message": "Tag deleted successfully", "status_code": 200}
-        
+
         except Exception as e:
             return {"error": f"Error deleting tag - {e}", "status_code": 400}
 
 
-class TaskData:
+class TaskData(BaseData):
     """Class to read and write data from/to the tasks table"""
-    def create_task(
-            self, user_id: int, title: str, description: str=None, 
+    async def create_task(
+            self, user_id: int, title: str, description: str=None,
             tag: str=None, due_date: date=None, priority: str=None
         ) -> dict:
-        """Creates a new task for a user"""
-        user = UserData().get_user(user_id=user_id)
-        if not user:
-            return {"error": f"User:{user_id} doesn't exist", "status_code": 404}
+        """
+        Creates a new task for a user with a single INSERT ... RETURNING statement and returns it.
+        The tag is resolved inside the statement and the user's existence is enforced by the
+        foreign key, so no separate lookups are needed.
+        """
+        values = {
+            "user_id": user_id,
+            "title": title,
+            "description": description or None,
+            "due_date": due_date or None,
+            "priority": priority or TaskPriority.Medium.value,
+            "status": TaskStatus.Pending.value
+        }
+
+        if tag:
+            # Constrained insert, the SELECT yields no row (so nothing is inserted or returned)
+            # when the tag doesn't exist for the user
+            columns = Task.__table__.c
+            source = select(
+                *[cast(literal(value), columns[name].type).label(name) for name, value in values.items()],
+                Tag.tag_id,
+                Tag.tag
+            ).where(Tag.user_id == user_id, Tag.tag == tag)
+            statement = insert(Task).from_select([*values, "tag_id", "tag"], source)
+
+        else:
+            statement = insert(Task).values(**values)
 
         try:
-            new_task = Task(user_id=user_id, title=title)
-            
-            # Optional Parameters
-            if description:
-                new_task.description = description
+            new_task = (await self.session.execute(statement.returning(*TASK_LIST_COLUMNS))).mappings().first()
 
-            if tag:
-                try:
-                    tag_ = TagData().get_tag(user_id=user_id, tag=tag)
-                    new_task.tag = tag
-                    new_task.tag_id = tag_.tag_id
-            
-                except AttributeError as e:
-                    return {"error": f"Tag:{tag} doesn't exist for User:{user_id}", "status_code": 404}
-            
-            if due_date:
-                new_task.due_date = due_date
+        except IntegrityError:
+            return {"error": f"User:{user_id} doesn't exist", "status_code": 404}
 
-            if priority:
-                new_task.priority = priority
-            
-            with SessionManager(db_url=DB_URL) as session:
-                session.add(new_task)
-                session.commit()
-
-            return {"message": "Task created successfully", "status_code": 201}
-        
         except Exception as e:
             return {"error": f"Error adding new task - {e}", "status_code": 400}
-    
-    def update_task(
+
+        if new_task is None:
+            return {"error": f"Tag:{tag} doesn't exist for User:{user_id}", "status_code": 404}
+
+        return {"message": "Task created successfully", "task": new_task, "status_code": 201}
+
+    async def update_task(
             self, user_id: int, task_id: int, title: str=None, description: str=None,
             tag: str=None, due_date: date=None, priority: str=None, status: str=None
         ) -> dict:
         """Updates the task with the new title, description, status and tag if the task exists"""
-        task = self.get_task(user_id=user_id, task_id=task_id)
+        task = await self.get_task(user_id=user_id, task_id=task_id)
         if not task:
             return {"error": f"Task:{task_id} doesn't exist for User:{user_id}", "status_code": 404}
-        
+
         try:
             if title:
                 task.title = title
-            
+
             if description:
                 task.description = description
-            
+
             if tag:
                 try:
-                    tag_data = TagData().get_tag(user_id=user_id, tag=tag)
+                    tag_data = await TagData(self.session).get_tag(user_id=user_id, tag=tag)
                     task.tag = tag
                     task.tag_id = tag_data.tag_id
 
                 except AttributeError as e:
                     return {"error": f"Tag:{tag} doesn't exist for User:{user_id}", "status_code": 404}
-            
+
             if due_date:
                 task.due_date = due_date
-            
+
             if priority:
                 task.priority = priority
-            
+
             if status:
                 task.status = status
 
-            with SessionManager(db_url=DB_URL) as session:
-                session.merge(task)
-                session.commit()
+            # task is still attached to the session, a flush is enough (no merge round trip)
+            await self.session.flush()
 
             return {"message": "Task updated successfully", "status_code": 200}
 
         except Exception as e:
             return {"error": f"Error updating task - {e}", "status_code": 400}
-    
-    def delete_task(self, user_id: int, task_id: int) -> dict:
+
+    async def delete_task(self, user_id: int, task_id: int) -> dict:
         """Delete task from the database by user_id and task_id"""
-        task = self.get_task(user_id=user_id, task_id=task_id)
+        task = await self.get_task(user_id=user_id, task_id=task_id)
         if not task:
             return {"error": f"Task:{task_id} doesn't exist for User:{user_id}", "status_code": 404}
-        
+
         try:
-            with SessionManager(db_url=DB_URL) as session:
-                session.add(task)
-                session.delete(task)
-                session.commit()
-            
+            await self.session.delete(task)
+            await self.session.flush()
+
             return {"message": "Task deleted successfully", "status_code": 200}
-            
+
         except Exception as e:
             return {"error": f"Error deleting task - {e}", "status_code": 400}
-    
-    def get_task(self, user_id: int, task_id: int) -> Task:
+
+    async def apply_task_batch(self, user_id: int, operations: List[dict]) -> dict:
+        """
+        Applies a batch of {"op", "task_id", "data"} operations for a user with one statement per
+        kind of operation, in this order: a multi-row INSERT for the creates, an UPDATE ... FROM
+        (VALUES ...) for the updates and a DELETE ... WHERE task_id = ANY(...) for the deletes.
+        Returns one result per operation in request order, a failing item doesn't stop the others.
+        """
+        results = [None] * len(operations)
+        creates, updates, deletes = [], [], []
+        seen_task_ids = set()
+
+        # A single lookup for every tag referenced by the batch
+        tag_names = {operation["data"]["tag"] for operation in operations if operation.get("data", {}).get("tag")}
+        tags = {}
+        if tag_names:
+            tags = dict((await self.session.execute(
+                select(Tag.tag, Tag.tag_id).filter(Tag.user_id == user_id, Tag.tag.in_(tag_names))
+            )).all())
+
+        for index, operation in enumerate(operations):
+            op, task_id, data = operation["op"], operation.get("task_id"), dict(operation.get("data") or {})
+            result = {"index": index, "op": op, "task_id": task_id}
+
+            if data.get("tag"):
+                if data["tag"] not in tags:
+                    results[index] = {**result, "error": f"Tag:{data['tag']} doesn't exist for User:{user_id}", "status_code": 404}
+                    continue
+
+                data["tag_id"] = tags[data["tag"]]
+
+            if op != "create":
+                if task_id in seen_task_ids:
+                    results[index] = {**result, "error": f"Task:{task_id} appears more than once in the batch", "status_code": 409}
+                    continue
+
+                seen_task_ids.add(task_id)
+
+            {"create": creates, "update": updates, "delete": deletes}[op].append((index, task_id, data))
+
+        try:
+            if creates:
+                rows = [{
+                    "user_id": user_id,
+                    "title": data["title"],
+                    "description": data.get("description") or None,
+                    "tag_id": data.get("tag_id"),
+                    "tag": data.get("tag"),
+                    "due_date": data.get("due_date"),
+                    "priority": data.get("priority") or TaskPriority.Medium.value,
+                    "status": TaskStatus.Pending.value
+                } for _, _, data in creates]
+                # Sent as multi-row INSERT ... VALUES statements, the returned ids follow the rows order
+                new_task_ids = (await self.session.scalars(
+                    insert(Task).returning(Task.task_id, sort_by_parameter_order=True), rows
+                )).all()
+                for (index, _, _), new_task_id in zip(creates, new_task_ids):
+                    results[index] = {"index": index, "op": "create", "task_id": new_task_id, "status_code": 201}
+
+            if updates:
+                # Omitted fields are NULL in the VALUES list and keep their current value
+                columns = Task.__table__.c
+                fields = ["title", "description", "tag_id", "tag", "due_date", "priority", "status"]
+                changes = values(
+                    column("task_id", Integer), *[column(name, columns[name].type) for name in fields], name="changes"
+                ).data([(task_id, *[data.get(name) for name in fields]) for _, task_id, data in updates])
+                updated = set((await self.session.scalars(
+                    update(Task)
+                    .where(Task.task_id == changes.c.task_id, Task.user_id == user_id)
+                    .values({
+                        name: func.coalesce(cast(changes.c[name], columns[name].type), columns[name])
+                        for name in fields
+                    })
+                    .returning(Task.task_id)
+                    .execution_options(synchronize_session=False)
+                )).all())
+                for index, task_id, _ in updates:
+                    results[index] = self._batch_result(index, "update", task_id, user_id, task_id in updated)
+
+            if deletes:
+                deleted = set((await self.session.scalars(
+                    delete(Task)
+                    .where(
+                        Task.user_id == user_id,
+                        Task.task_id == any_(literal([task_id for _, task_id, _ in deletes], ARRAY(Integer)))
+                    )
+                    .returning(Task.task_id)
+                    .execution_options(synchronize_session=False)
+                )).all())
+                for index, task_id, _ in deletes:
+                    results[index] = self._batch_result(index, "delete", task_id, user_id, task_id in deleted)
+
+        except Exception as e:
+            return {"error": f"Error applying batch - {e}", "status_code": 400}
+
+        return {"results": results, "status_code": 200}
+
+    @staticmethod
+    def _batch_result(index: int, op: str, task_id: int, user_id: int, found: bool) -> dict:
+        if found:
+            return {"index": index, "op": op, "task_id": task_id, "status_code": 200}
+
+        return {
+            "index": index, "op": op, "task_id": task_id,
+            "error": f"Task:{task_id} doesn't exist for User:{user_id}", "status_code": 404
+        }
+
+    async def import_tasks(self, user_id: int, records: AsyncIterable[tuple], max_errors: int) -> dict:
+        """
+        Bulk loads (line, title, description, tag, due_date, priority, status) records for a user:
+        COPY into a temporary staging table, then one INSERT ... SELECT that resolves the tag names
+        with a single join on tags. Rows naming an unknown tag are skipped and reported by line
+        (up to max_errors of them), the other rows are imported.
+        """
+        try:
+            connection = await self.session.connection()
+            await connection.run_sync(task_import.create)
+
+            # COPY is only exposed by the driver, on the connection (and transaction) of this session
+            driver_connection = (await connection.get_raw_connection()).driver_connection
+            copied = await driver_connection.copy_records_to_table(
+                task_import.name, records=records, columns=[c.name for c in task_import.c]
+            )
+            staged = int(copied.split()[-1])
+
+            staging = task_import.c
+            tag_join = and_(Tag.user_id == user_id, Tag.tag == staging.tag)
+            source = task_import.outerjoin(Tag, tag_join)
+
+            unknown_tags = (await self.session.execute(
+                select(staging.line, staging.tag)
+                .select_from(source)
+                .where(staging.tag.is_not(None), Tag.tag_id.is_(None))
+                .order_by(staging.line)
+                .limit(max_errors)
+            )).all()
+
+            result = await self.session.execute(
+                insert(Task).from_select(
+                    ["user_id", "title", "description", "tag_id", "tag", "due_date", "priority", "status"],
+                    select(
+                        literal(user_id, Integer), staging.title, staging.description, Tag.tag_id, Tag.tag,
+                        staging.due_date, cast(staging.priority, Task.priority.type),
+                        cast(staging.status, Task.status.type)
+                    )
+                    .select_from(source)
+                    .where(or_(staging.tag.is_(None), Tag.tag_id.is_not(None)))
+                    .order_by(staging.line)
+                )
+            )
+
+        except Exception as e:
+            return {"error": f"Error importing tasks - {e}", "status_code": 400}
+
+        return {
+            "imported": result.rowcount,
+            "skipped": staged - result.rowcount,
+            "unknown_tags": unknown_tags,
+            "status_code": 200
+        }
+
+    async def stream_tasks(self, user_id: int, columns: List[str], batch_size: int) -> AsyncIterator[list]:
+        """
+        Yields every task of a user in task_id order as lists of up to batch_size row mappings,
+        read from a server side cursor so that only one batch is held in memory at a time
+        """
+        result = await self.session.stream(
+            select(*[getattr(Task, name) for name in columns])
+            .filter(Task.user_id == user_id)
+            .order_by(Task.task_id)
+            .execution_options(yield_per=batch_size)
+        )
+        async for rows in result.mappings().partitions():
+            yield rows
+
+    async def get_task(self, user_id: int, task_id: int) -> Task:
         """Read and return data from the db filter by user_id and task_id"""
-        with SessionManager(db_url=DB_URL) as session:
-            task = session.query(Task).filter_by(user_id=user_id, task_id=task_id).first()
-            return task
-    
-    def get_all_tasks(self, user_id: int) -> List[Task]:
-        """Returns all tasks for a user"""
-        with SessionManager(db_url=DB_URL) as session:
-            tasks = session.query(Task).filter_by(user_id=user_id).all()
-            return tasks
-    
-    def get_tasks_by_tag(self, user_id: int, tag: str) -> List[Task]:
-        """Returns all tasks for a user for a specific tag"""
-        with SessionManager(db_url=DB_URL) as session:
-            tasks = session.query(Task).filter_by(user_id=user_id, tag=tag).all()
-            return tasks
-    
-    def get_tasks_by_status(self, user_id: int, status: str) -> List[Task]:
-        """Returns all tasks for a user for a specific status"""
-        with SessionManager(db_url=DB_URL) as session:
-            tasks = session.query(Task).filter_by(user_id=user_id, status=status).all()
-            return tasks
-        
-    def get_tasks_by_priority(self, user_id: int, priority: str) -> List[Task]:
-        """Returns all tasks for a user for a specific priority"""
-        with SessionManager(db_url=DB_URL) as session:
-            tasks = session.query(Task).filter_by(user_id=user_id, priority=priority).all()
-            return tasks
-        
-    def search_tasks_by_text(self, user_id: int, text: str) -> List[Task]:
-        """Returns all tasks for a user by searching for a sub sting in the title or description"""
-        with SessionManager(db_url=DB_URL) as session:
-            tasks1 = session.query(Task).filter(Task.user_id == user_id, Task.title.ilike(f"%{text}%")).all()
-            task2 = session.query(Task).filter(Task.user_id == user_id, Task.description.ilike(f"%{text}%")).all()
-            data = list(set(tasks1 + task2)) # Remove duplicates from tasks1 + tasks2
-            return data
-    
-    def auto_update_task_status_to_overdue(self) -> dict:
+        task = await self.session.scalar(select(Task).filter_by(user_id=user_id, task_id=task_id))
+        return task
+
+    async def get_task_tags(self, user_id: int, task_id: int) -> dict:
+        """Returns the names of every tag of a task, sorted"""
+        if not await self.get_task(user_id=user_id, task_id=task_id):
+            return {"error": f"Task:{task_id} doesn't exist for User:{user_id}", "status_code": 404}
+
+        tags = (await self.session.scalars(
+            select(Tag.tag)
+            .join(TaskTag, TaskTag.tag_id == Tag.tag_id)
+            .filter(TaskTag.user_id == user_id, TaskTag.task_id == task_id)
+            .order_by(Tag.tag)
+        )).all()
+
+        return {"tags": tags, "status_code": 200}
+
+    async def add_task_tags(self, user_id: int, task_id: int, tags: List[str]) -> dict:
+        """Adds tags to a task with a single INSERT ... SELECT, tags the task already has are kept as is"""
+        if not await self.get_task(user_id=user_id, task_id=task_id):
+            return {"error": f"Task:{task_id} doesn't exist for User:{user_id}", "status_code": 404}
+
+        tag_ids = dict((await self.session.execute(
+            select(Tag.tag, Tag.tag_id).filter(Tag.user_id == user_id, Tag.tag.in_(set(tags)))
+        )).all())
+        missing = sorted(set(tags) - set(tag_ids))
+        if missing:
+            return {"error": f"Tag:{', '.join(missing)} doesn't exist for User:{user_id}", "status_code": 404}
+
+        try:
+            await self.session.execute(
+                pg_insert(TaskTag)
+                .values([{"user_id": user_id, "tag_id": tag_id, "task_id": task_id} for tag_id in tag_ids.values()])
+                .on_conflict_do_nothing()
+            )
+
+            return {"message": "Tags added successfully", "status_code": 200}
+
+        except Exception as e:
+            return {"error": f"Error adding tags - {e}", "status_code": 400}
+
+    async def remove_task_tag(self, user_id: int, task_id: int, tag: str) -> dict:
+        """Removes a tag from a task, if it was the primary tag the task is left without one"""
+        tag_ = await TagData(self.session).get_tag(user_id=user_id, tag=tag)
+        if not tag_:
+            return {"error": f"Tag:{tag} doesn't exist for User:{user_id}", "status_code": 404}
+
+        try:
+            removed = await self.session.scalar(
+                delete(TaskTag)
+                .where(TaskTag.user_id == user_id, TaskTag.tag_id == tag_.tag_id, TaskTag.task_id == task_id)
+                .returning(TaskTag.task_id)
+            )
+            if removed is None:
+                return {"error": f"Task:{task_id} doesn't have Tag:{tag} for User:{user_id}", "status_code": 404}
+
+            await self.session.execute(
+                update(Task)
+                .where(Task.user_id == user_id, Task.task_id == task_id, Task.tag_id == tag_.tag_id)
+                .values(tag_id=None, tag=None)
+                .execution_options(synchronize_session=False)
+            )
+
+            return {"message": "Tag removed successfully", "status_code": 200}
+
+        except Exception as e:
+            return {"error": f"Error removing tag - {e}", "status_code": 400}
+
+    async def get_tasks_by_tags(self, user_id: int, tags: List[str], match_all: bool, page: Page) -> dict:
+        """
+        Returns one page of tasks of a user having all (match_all) or any of the tags. The matching
+        task_ids come from task_tags primary key ranges, one per tag, and for all tags a
+        GROUP BY task_id HAVING count(*) = number of tags keeps the tasks found in every range.
         """
-        Auto updates task status to 'Overdue' if the current date (login date) is greater than 
-        the due date and the task status is not 'Completed'
+        tags = set(tags)
+        matching = (
+            select(TaskTag.task_id)
+            .join(Tag, Tag.tag_id == TaskTag.tag_id)
+            .filter(TaskTag.user_id == user_id, Tag.user_id == user_id, Tag.tag.in_(tags))
+        )
+        if match_all:
+            matching = matching.group_by(TaskTag.task_id).having(func.count() == len(tags))
+
+        statement = select(*TASK_LIST_COLUMNS).filter(Task.user_id == user_id, Task.task_id.in_(matching))
+        return await paginate(self.session, statement, Task.task_id, Task.task_id, page, mappings=True)
+
+    async def get_task_summary(self, user_id: int) -> dict:
+        """
+        Returns the task counts of a user in total, by status, by priority and by tag from task_counters.
+        Tag counters come from task_tags and are keyed by tag_id, the join gives them their current name.
+        """
+        counters = (await self.session.execute(
+            select(TaskCounter.dimension, func.coalesce(Tag.tag, TaskCounter.value), TaskCounter.count)
+            .outerjoin(Tag, and_(
+                TaskCounter.dimension == "tag", Tag.user_id == user_id, cast(Tag.tag_id, String) == TaskCounter.value
+            ))
+            .filter(
+                TaskCounter.user_id == user_id, TaskCounter.count > 0,
+                or_(TaskCounter.dimension != "tag", Tag.tag_id.is_not(None))
+            )
+        )).all()
+
+        counts = {dimension: {} for dimension in ("total", "status", "priority", "tag")}
+        for dimension, value, count in counters:
+            counts.setdefault(dimension, {})[value] = count
+
+        return {
+            "task_count": counts["total"].get("all", 0),
+            "by_status": {status.value: counts["status"].get(status.value, 0) for status in TaskStatus},
+            "by_priority": {priority.value: counts["priority"].get(priority.value, 0) for priority in TaskPriority},
+            "by_tag": counts["tag"],
+            "status_code": 200
+        }
+
+    async def query_tasks(
+            self, user_id: int, page: Page, status: List[str]=None, priority: List[str]=None,
+            tag: str=None, due_after: date=None, due_before: date=None, text: str=None,
+            sort: str="task_id", descending: bool=False
+        ) -> dict:
+        """
+        Returns one page of tasks for a user matching every given filter, built as a single
+        statement so that Postgres can serve it from the (user_id, <filter>, task_id) indexes
+        """
+        statement = select(*TASK_LIST_COLUMNS).filter(Task.user_id == user_id)
+
+        if status:
+            statement = statement.filter(Task.status.in_(status))
+
+        if priority:
+            statement = statement.filter(Task.priority.in_(priority))
+
+        if tag:
+            # Any of the task's tags, not only the primary one (same as get_tasks_by_tags)
+            statement = statement.filter(Task.task_id.in_(
+                select(TaskTag.task_id)
+                .join(Tag, Tag.tag_id == TaskTag.tag_id)
+                .filter(TaskTag.user_id == user_id, Tag.user_id == user_id, Tag.tag == tag)
+            ))
+
+        if due_after:
+            statement = statement.filter(Task.due_date >= due_after)
 
-        Note: This function has to be called every time when the user logs in
+        if due_before:
+            statement = statement.filter(Task.due_date <= due_before)
+
+        if text:
+            statement = statement.filter(task_text_match(text))
+
+        sort_column = getattr(Task, sort)
+        return await paginate(
+            self.session, statement, sort_column, Task.task_id, page, descending=descending, mappings=True
+        )
+
+    async def get_all_tasks(self, user_id: int, page: Page) -> dict:
+        """Returns one page of tasks for a user"""
+        return await self.query_tasks(user_id=user_id, page=page)
+
+    async def get_tasks_by_tag(self, user_id: int, tag: str, page: Page) -> dict:
+        """Returns one page of tasks for a user having a specific tag (primary or not)"""
+        return await self.query_tasks(user_id=user_id, page=page, tag=tag)
+
+    async def get_tasks_by_status(self, user_id: int, status: str, page: Page) -> dict:
+        """Returns one page of tasks for a user for a specific status"""
+        return await self.query_tasks(user_id=user_id, page=page, status=[status])
+
+    async def get_tasks_by_priority(self, user_id: int, priority: str, page: Page) -> dict:
+        """Returns one page of tasks for a user for a specific priority"""
+        return await self.query_tasks(user_id=user_id, page=page, priority=[priority])
+
+    async def search_tasks_by_text(self, user_id: int, text: str, limit: int) -> dict:
+        """
+        Returns up to `limit` tasks of a user matching the text in the title or description, most
+        relevant first: full text matches by ts_rank, then substring only matches by similarity
+        """
+        statement = (
+            select(*TASK_LIST_COLUMNS)
+            .filter(Task.user_id == user_id, task_text_match(text))
+            .order_by(
+                func.ts_rank(Task.search_vector, task_search_query(text)).desc(),
+                func.similarity(TASK_SEARCH_TEXT_COLUMN, text).desc(),
+                Task.task_id.desc()
+            )
+            .limit(limit)
+        )
+        tasks = (await self.session.execute(statement)).mappings().all()
+
+        return {"rows": tasks, "status_code": 200}
+
+    async def mark_overdue_tasks(self, user_id: int=None, batch_size: int=None) -> int:
         """
+        Sets status 'Overdue' on Pending tasks whose due date has passed, for one user or for every
+        user, in a single UPDATE. With batch_size at most that many rows are updated, rows locked by
+        other transactions are skipped. Returns how many tasks were updated.
+        """
+        overdue = select(Task.task_id).filter(
+            Task.due_date < func.current_date(), Task.status == TaskStatus.Pending
+        )
+        if user_id:
+            overdue = overdue.filter(Task.user_id == user_id)
 
-        tasks = self.get_all_tasks(user_id=1)
-        current_date = datetime.now()
+        if batch_size:
+            overdue = overdue.limit(batch_size).with_for_update(skip_locked=True)
 
-        for task in tasks:
-            if task.due_date and task.status != 'Completed':
-                if current_date > task.due_date:
-                    task.status = 'Overdue'
-                    with SessionManager(db_url=DB_URL) as session:
-                        session.merge(task)
-                        session.commit()
-        
-        return {"message": "Tasks' status refreshed!", "status_code": 200}
+        result = await self.session.execute(
+            update(Task)
+            .where(Task.task_id.in_(overdue))
+            .values(status=TaskStatus.Overdue)
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount
 
 
-class TokenData:
+class TokenData(BaseData):
     """Class to read and write data from/to the revoked_tokens table"""
-    def revoke_token(self, token: str) -> dict:
-        """Revoke a JWT token"""
+    async def revoke_token(self, jti: str, expires_at: datetime) -> dict:
+        """Revoke a JWT token by its jti claim, the row is kept only until the token expires"""
         try:
-            with SessionManager(db_url=DB_URL) as session:
-                new_revoked_token = RevokedToken(token=token)
-                session.add(new_revoked_token)
-                session.commit()
-            
+            new_revoked_token = RevokedToken(jti=jti, expires_at=expires_at)
+            self.session.add(new_revoked_token)
+            await self.session.flush()
+            REVOKED_TOKENS.add(jti, expires_at.timestamp())
+
             return {"message": "Token revoked successfully", "status_code": 200}
-            
+
         except Exception as e:
             return {"error": f"Error revoking token - {e}", "status_code": 400}
-        
-    
-    def check_if_token_revoked(self, token: str) -> bool:
-        """Check if a token is revoked"""
-        with SessionManager(db_url=DB_URL) as session:
-            data = session.query(RevokedToken).filter_by(token=token).first()
-        
+
+
+    async def check_if_token_revoked(self, jti: str) -> bool:
+        """Check if a token is revoked, the db is only queried when the in-memory cache can't answer"""
+        revoked = REVOKED_TOKENS.is_revoked(jti)
+        if revoked is not None:
+            return revoked
+
+        data = await self.session.scalar(select(RevokedToken.id).filter_by(jti=jti))
+
         return bool(data)
+
+    async def get_all_revoked_tokens(self) -> List[tuple]:
+        """Returns (jti, expires_at) of every unexpired revoked token, used to warm the in-memory cache"""
+        rows = (await self.session.execute(
+            select(RevokedToken.jti, RevokedToken.expires_at).filter(RevokedToken.expires_at > func.now())
+        )).all()
+        return rows
+
+    async def purge_expired_tokens(self, batch_size: int) -> int:
+        """Deletes up to batch_size expired rows and returns how many were deleted"""
+        expired = (
+            select(RevokedToken.id)
+            .filter(RevokedToken.expires_at <= func.now())
+            .limit(batch_size)
+        )
+        result = await self.session.execute(
+            delete(RevokedToken).where(RevokedToken.id.in_(expired)).execution_options(synchronize_session=False)
+        )
+        return result.rowcount
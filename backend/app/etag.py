@@ -0,0 +1,40 @@
+# Standard Imports
+import hashlib
+
+# Third-Party Imports
+from fastapi import HTTPException, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Local Imports
+from backend.app.database import UserData
+
+
+def make_etag(user_id: int, data_version: int, request: Request) -> str:
+    """Weak ETag of a GET for a user's data version, the path and query make each listing page distinct"""
+    query = hashlib.blake2b(f"{request.url.path}?{request.url.query}".encode("utf-8"), digest_size=8).hexdigest()
+    return f'W/"{user_id}-{data_version}-{query}"'
+
+
+def etag_matches(etag: str, if_none_match: str) -> bool:
+    """Weak comparison of an ETag against the If-None-Match header of a request"""
+    if if_none_match.strip() == "*":
+        return True
+
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in if_none_match.split(","))
+
+
+async def check_etag(request: Request, session: AsyncSession, user_id: int) -> dict:
+    """
+    Looks up the data version of the user and returns the caching headers of the response, or raises
+    304 Not Modified when If-None-Match already holds the current ETag, before any listing query runs.
+    The version is read first, so a response can be newer than its ETag but never older.
+    """
+    data_version = await UserData(session).get_data_version(user_id=user_id)
+    headers = {"ETag": make_etag(user_id, data_version, request), "Cache-Control": "private, no-cache"}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_matches(headers["ETag"], if_none_match):
+        raise HTTPException(status_code=304, headers=headers)
+
+    return headers
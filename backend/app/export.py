@@ -0,0 +1,61 @@
+# Standard Imports
+import io
+import csv
+import json
+import enum
+from datetime import date
+from typing import AsyncIterator
+
+# Local Imports
+from config_file import EXPORT_BATCH_SIZE
+from backend.app.utils import SessionManager
+from backend.app.database import TaskData
+
+# Exported columns, in CSV header order (the TaskResponse fields but user_id, which is the same on every row)
+EXPORT_COLUMNS = ["task_id", "title", "description", "tag_id", "tag", "due_date", "priority", "status"]
+
+
+def _plain(value):
+    # Enums and dates as the API returns them
+    if isinstance(value, enum.Enum):
+        return value.value
+
+    if isinstance(value, date):
+        return value.isoformat()
+
+    return value
+
+
+def to_ndjson(rows: list) -> str:
+    """Encodes row mappings as newline delimited JSON objects"""
+    return "".join(
+        json.dumps({name: _plain(row[name]) for name in EXPORT_COLUMNS}, ensure_ascii=False) + "\n" for row in rows
+    )
+
+
+def to_csv(rows: list, header: bool = False) -> str:
+    """Encodes row mappings as CSV lines, optionally preceded by the header line"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(EXPORT_COLUMNS)
+
+    writer.writerows([_plain(row[name]) for name in EXPORT_COLUMNS] for row in rows)
+    return buffer.getvalue()
+
+
+async def export_tasks(user_id: int, export_format: str) -> AsyncIterator[str]:
+    """
+    Yields the tasks of a user as NDJSON or CSV, one chunk per batch read from the server side cursor.
+    The generator owns its session, it is consumed by StreamingResponse after the route has returned
+    and the request scoped session is gone.
+    """
+    if export_format == "csv":
+        # The header goes out before the first query, so the client gets its first byte right away
+        yield to_csv([], header=True)
+
+    async with SessionManager() as session:
+        async for rows in TaskData(session).stream_tasks(
+                user_id=user_id, columns=EXPORT_COLUMNS, batch_size=EXPORT_BATCH_SIZE
+            ):
+            yield to_csv(rows) if export_format == "csv" else to_ndjson(rows)
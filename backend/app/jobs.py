@@ -0,0 +1,66 @@
+# Standard Imports
+import asyncio
+import logging
+from typing import Awaitable, Callable, List
+
+# Local Imports
+from config_file import REVOKED_TOKENS_PURGE_BATCH, OVERDUE_SWEEP_BATCH
+from backend.app.utils import SessionManager
+from backend.app.database import TokenData, TaskData
+from backend.app.cache import REVOKED_TOKENS
+
+logger = logging.getLogger(__name__)
+
+
+async def sync_revoked_tokens() -> None:
+    """Merges the revoked_tokens table into the in-memory cache, picking up revocations made by other workers"""
+    async with SessionManager() as session:
+        tokens = await TokenData(session).get_all_revoked_tokens()
+
+    REVOKED_TOKENS.merge((jti, expires_at.timestamp()) for jti, expires_at in tokens)
+
+
+async def purge_expired_tokens() -> None:
+    """Deletes expired rows from revoked_tokens in bounded batches, one short transaction per batch"""
+    while True:
+        async with SessionManager() as session:
+            deleted = await TokenData(session).purge_expired_tokens(batch_size=REVOKED_TOKENS_PURGE_BATCH)
+            await session.commit()
+
+        if deleted < REVOKED_TOKENS_PURGE_BATCH:
+            break
+
+
+async def sweep_overdue_tasks() -> None:
+    """Marks overdue tasks of every user in bounded batches, one short transaction per batch"""
+    while True:
+        async with SessionManager() as session:
+            updated = await TaskData(session).mark_overdue_tasks(batch_size=OVERDUE_SWEEP_BATCH)
+            await session.commit()
+
+        if updated < OVERDUE_SWEEP_BATCH:
+            break
+
+
+async def run_periodically(interval: float, job: Callable[[], Awaitable[None]]) -> None:
+    """Runs a job every `interval` seconds until cancelled, a failing run doesn't stop the loop"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await job()
+
+        except Exception:
+            logger.exception("Background job %s failed", job.__name__)
+
+
+def start_jobs(jobs: List[tuple]) -> List[asyncio.Task]:
+    """Starts (interval, job) pairs as background tasks, a falsy interval disables the job"""
+    return [asyncio.create_task(run_periodically(interval, job)) for interval, job in jobs if interval]
+
+
+async def stop_jobs(tasks: List[asyncio.Task]) -> None:
+    """Cancels the background tasks started by start_jobs and waits for them to finish"""
+    for task in tasks:
+        task.cancel()
+
+    await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,221 @@
+# Standard Imports
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+# Third-Party Imports
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from starlette.routing import Match
+
+# Local Imports
+from config_file import METRICS_LATENCY_BUCKETS, METRICS_QUERY_COUNT_BUCKETS
+
+# [query count, db seconds] of the request being served, None outside of requests (background jobs)
+_REQUEST_QUERIES: ContextVar[Optional[list]] = ContextVar("request_queries", default=None)
+
+
+def _labels(names: Tuple[str, ...], values: Tuple) -> str:
+    if not names:
+        return ""
+
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"') for value in values)
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(names, escaped)) + "}"
+
+
+class Counter:
+    """Monotonic counter per label values"""
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name, self.help, self.labels = name, help, labels
+        self._values: Dict[tuple, float] = {}
+
+    def inc(self, *label_values, amount: float = 1) -> None:
+        self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{_labels(self.labels, key)} {value}" for key, value in self._values.items()]
+
+
+class Gauge(Counter):
+    """Value that goes up and down per label values"""
+    kind = "gauge"
+
+    def dec(self, *label_values, amount: float = 1) -> None:
+        self.inc(*label_values, amount=-amount)
+
+    def set(self, *label_values, value: float) -> None:
+        self._values[label_values] = value
+
+
+class Histogram:
+    """
+    Prometheus style histogram per label values. observe() is a bisect and two additions,
+    the buckets are only made cumulative when /metrics is rendered.
+    """
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: Tuple[float, ...], labels: Tuple[str, ...] = ()):
+        self.name, self.help, self.labels, self.buckets = name, help, labels, tuple(buckets)
+        self._series: Dict[tuple, list] = {}
+
+    def observe(self, value: float, *label_values) -> None:
+        series = self._series.get(label_values)
+        if series is None:
+            series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def samples(self) -> List[str]:
+        lines = []
+        for key, (counts, total) in self._series.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels((*self.labels, 'le'), (*key, bound))} {cumulative}")
+
+            lines.append(f"{self.name}_sum{_labels(self.labels, key)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.labels, key)} {cumulative}")
+
+        return lines
+
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "Time to serve a request, by route template", METRICS_LATENCY_BUCKETS, ("method", "route")
+)
+REQUESTS = Counter("http_requests_total", "Requests served, by route template and status code", ("method", "route", "status"))
+REQUESTS_IN_FLIGHT = Gauge("http_requests_in_flight", "Requests being served", ("method",))
+REQUEST_QUERIES = Histogram(
+    "http_request_db_queries", "SQL statements issued per request", METRICS_QUERY_COUNT_BUCKETS, ("method", "route")
+)
+REQUEST_DB_TIME = Histogram(
+    "http_request_db_seconds", "Time spent in SQL statements per request", METRICS_LATENCY_BUCKETS, ("method", "route")
+)
+QUERY_DURATION = Histogram("db_query_duration_seconds", "Time of a single SQL statement", METRICS_LATENCY_BUCKETS)
+POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds", "Time waited for a pooled connection", METRICS_LATENCY_BUCKETS, ("database",)
+)
+POOL_SIZE = Gauge("db_pool_size", "Configured size of the connection pool", ("database",))
+POOL_CHECKED_OUT = Gauge("db_pool_checked_out", "Connections currently in use", ("database",))
+POOL_OVERFLOW = Gauge("db_pool_overflow", "Connections open beyond pool_size (negative while the pool fills up)", ("database",))
+
+METRICS = [
+    REQUEST_DURATION, REQUESTS, REQUESTS_IN_FLIGHT, REQUEST_QUERIES, REQUEST_DB_TIME, QUERY_DURATION,
+    POOL_CHECKOUT_WAIT, POOL_SIZE, POOL_CHECKED_OUT, POOL_OVERFLOW
+]
+
+# database label -> pool, read when /metrics is rendered
+_POOLS: Dict[str, "TimedAsyncAdaptedQueuePool"] = {}
+
+
+class TimedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    """The default asyncio pool, timing how long each checkout waits for a connection"""
+    database = ""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+
+        finally:
+            POOL_CHECKOUT_WAIT.observe(time.perf_counter() - start, self.database)
+
+
+# The start time lives on the execution context, which is dropped with it when a statement fails
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context.metrics_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context.metrics_start
+    QUERY_DURATION.observe(elapsed)
+
+    queries = _REQUEST_QUERIES.get()
+    if queries is not None:
+        queries[0] += 1
+        queries[1] += elapsed
+
+
+def instrument_engine(engine, database: str) -> None:
+    """Times every statement of a (sync) engine and exposes its pool, called once per engine"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+    if isinstance(engine.pool, TimedAsyncAdaptedQueuePool):
+        engine.pool.database = database
+        _POOLS[database] = engine.pool
+
+
+def render() -> str:
+    """Returns every metric in the Prometheus text exposition format"""
+    for database, pool in _POOLS.items():
+        POOL_SIZE.set(database, value=pool.size())
+        POOL_CHECKED_OUT.set(database, value=pool.checkedout())
+        POOL_OVERFLOW.set(database, value=pool.overflow())
+
+    lines = []
+    for metric in METRICS:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+
+    return "\n".join(lines) + "\n"
+
+
+def route_template(scope) -> str:
+    """
+    Returns the path template of the route serving a request. Requests answered before routing
+    (401/403 from AuthMiddleware) are matched against the routes here, requests matching no
+    route share the 'unmatched' label to keep the series bounded.
+    """
+    route = scope.get("route")
+    if route is None:
+        for candidate in scope["app"].router.routes:
+            if candidate.matches(scope)[0] == Match.FULL:
+                route = candidate
+                break
+
+    return getattr(route, "path", "unmatched")
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording the latency, status, in-flight count, query count and db time of
+    every request. Requests are labelled by route template (e.g. /api/task/{task_id}).
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        method = scope["method"]
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        queries = [0, 0.0]
+        token = _REQUEST_QUERIES.set(queries)
+        REQUESTS_IN_FLIGHT.inc(method)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+
+        finally:
+            elapsed = time.perf_counter() - start
+            REQUESTS_IN_FLIGHT.dec(method)
+            _REQUEST_QUERIES.reset(token)
+
+            route = route_template(scope)
+            REQUEST_DURATION.observe(elapsed, method, route)
+            REQUESTS.inc(method, route, status)
+            REQUEST_QUERIES.observe(queries[0], method, route)
+            REQUEST_DB_TIME.observe(queries[1], method, route)
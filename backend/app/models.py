@@ -1,11 +1,37 @@
-from pydantic import BaseModel
-from typing import Optional, List
+import enum
+from pydantic import BaseModel, Field, field_validator
+from typing import Optional, List, Dict, Literal, Union, Annotated
 from datetime import date
 
 # Local Imports
+from config_file import MAX_BATCH_SIZE
 from backend.app.schemas import TaskStatus, TaskPriority
 
 
+class TaskSortKey(str, enum.Enum):
+    """Columns the task query endpoint can sort by, ties are always broken by task_id"""
+    task_id = "task_id"
+    due_date = "due_date"
+    title = "title"
+
+
+class SortOrder(str, enum.Enum):
+    asc = "asc"
+    desc = "desc"
+
+
+class TagMatch(str, enum.Enum):
+    """Whether tasks must have all of the requested tags or any of them"""
+    all = "all"
+    any = "any"
+
+
+class TaskFileFormat(str, enum.Enum):
+    """File formats of the task export and import endpoints"""
+    ndjson = "ndjson"
+    csv = "csv"
+
+
 # TAsk API Request Models
 class CreateTaskRequest(BaseModel):
     title: str
@@ -30,6 +56,51 @@ class UpdateTaskRequest(CreateTaskRequest):
     status: TaskStatus | None = None
 
 
+class ImportTaskRow(CreateTaskRequest):
+    """
+    One row of a task import file, imported tasks may already be completed. Values the tasks table
+    can't store are rejected here, so that they fail their own row and not the whole COPY.
+    """
+    title: str = Field(max_length=255)
+    tag: str | None = Field(None, max_length=255)
+    status: TaskStatus | None = None
+
+    @field_validator("title", "description", "tag")
+    @classmethod
+    def no_nul_characters(cls, value):
+        # Postgres text can't hold NUL characters
+        if value is not None and "\x00" in value:
+            raise ValueError("must not contain NUL characters")
+
+        return value
+
+
+# Batch Task API Request Models, each operation is validated by the model of its single-task endpoint
+class BatchCreateOperation(BaseModel):
+    op: Literal["create"]
+    data: CreateTaskRequest
+
+class BatchUpdateOperation(BaseModel):
+    op: Literal["update"]
+    task_id: int
+    data: UpdateTaskRequest
+
+class BatchDeleteOperation(BaseModel):
+    op: Literal["delete"]
+    task_id: int
+
+BatchOperation = Annotated[
+    Union[BatchCreateOperation, BatchUpdateOperation, BatchDeleteOperation], Field(discriminator="op")
+]
+
+class BatchTaskRequest(BaseModel):
+    operations: List[BatchOperation] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE)
+
+
+class TaskTagsRequest(BaseModel):
+    tags: List[str] = Field(..., min_length=1)
+
+
 # User API Request Models
 class UpdateUserRequest(BaseModel):
     new_username: str | None = None
@@ -45,13 +116,45 @@ class TaskResponse(BaseModel):
     tag_id: Optional[int]
     tag: Optional[str]
     due_date: Optional[date]
-    priority: str
-    status: str
+    priority: TaskPriority
+    status: TaskStatus
 
 class TasksResponse(BaseModel):
-    """Response model to return multiple tasks"""
+    """Response model to return multiple tasks, next_cursor is None on the last page"""
     task_count : int
     tasks: List[TaskResponse]
+    next_cursor: Optional[str] = None
+
+
+class BatchResult(BaseModel):
+    """Outcome of one operation of a batch, index is its position in the request"""
+    index: int
+    op: str
+    status_code: int
+    task_id: Optional[int] = None
+    error: Optional[str] = None
+
+class BatchTaskResponse(BaseModel):
+    """Response model to return the outcome of every operation of a batch"""
+    results: List[BatchResult]
+
+
+class ImportRowError(BaseModel):
+    """A rejected row of an import file, line is its line number in the file"""
+    line: int
+    error: str
+
+class ImportResponse(BaseModel):
+    """Response model to return the outcome of an import, errors lists at most IMPORT_MAX_ERRORS rows"""
+    imported: int
+    failed: int
+    errors: List[ImportRowError]
+
+
+class TaskTagsResponse(BaseModel):
+    """Response model to return every tag of a task"""
+    task_id: int
+    tags: List[str]
 
 
 # Tag API Response Models
@@ -61,9 +164,10 @@ class TagResponse(BaseModel):
     tag: str
 
 class TagsResponse(BaseModel):
-    """Response Model to return multiple tags"""
+    """Response Model to return multiple tags, next_cursor is None on the last page"""
     tag_count : int
     tags: List[TagResponse]
+    next_cursor: Optional[str] = None
 
 
 # Admin API Response Models
@@ -73,6 +177,28 @@ class UserResponse(BaseModel):
     username: str
 
 class UsersResponse(BaseModel):
-    """Response model to return multiple users"""
+    """Response model to return multiple users, next_cursor is None on the last page"""
     user_count : int
     users: List[UserResponse]
+    next_cursor: Optional[str] = None
+
+class TaskCounts(BaseModel):
+    """Number of tasks in total, by status and by priority"""
+    task_count: int
+    by_status: Dict[str, int]
+    by_priority: Dict[str, int]
+
+class TaskSummaryResponse(TaskCounts):
+    """Response model to return the task counts of the current user"""
+    by_tag: Dict[str, int]
+
+class UserTaskCounts(TaskCounts):
+    """Task counts of a single user"""
+    user_id: int
+    username: str
+
+class TaskStatsResponse(BaseModel):
+    """Response model to return the task counts of all users and of one page of users"""
+    totals: TaskCounts
+    users: List[UserTaskCounts]
+    next_cursor: Optional[str] = None
@@ -0,0 +1,196 @@
+# Standard Imports
+import json
+import base64
+import binascii
+from datetime import date, datetime
+from typing import NamedTuple, Optional
+
+# Third-Party Imports
+from fastapi import HTTPException, Query
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import BigInteger, and_, tuple_
+from sqlalchemy.sql import Select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Local Imports
+from config_file import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+
+
+class Page(NamedTuple):
+    """A page request, `after` holds the decoded (sort value, id) of the last row already seen"""
+    limit: int
+    after: Optional[list] = None
+
+
+def encode_cursor(values: list) -> str:
+    """Encodes the keyset of the last row of a page into an opaque url safe cursor"""
+    # Strings are tagged so that dates can round trip through JSON unambiguously
+    values = [
+        f"d:{value.isoformat()}" if isinstance(value, (date, datetime)) else
+        f"s:{value}" if isinstance(value, str) else value
+        for value in values
+    ]
+    return base64.urlsafe_b64encode(json.dumps(values, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> list:
+    """Decodes a cursor produced by encode_cursor, raises ValueError if it is malformed"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ValueError(f"Invalid cursor - {e}")
+
+    if not isinstance(values, list) or not 1 <= len(values) <= 2:
+        raise ValueError("Invalid cursor")
+
+    decoded = []
+    for value in values:
+        if isinstance(value, str):
+            kind, value = value[:2], value[2:]
+            if kind == "d:":
+                value = datetime.fromisoformat(value) if "T" in value else date.fromisoformat(value)
+            elif kind != "s:":
+                raise ValueError("Invalid cursor")
+
+        elif value is not None and type(value) is not int:
+            raise ValueError("Invalid cursor")
+
+        decoded.append(value)
+
+    return decoded
+
+
+def get_page(
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = Query(None, description="next_cursor of the previous page")
+    ) -> Page:
+    """FastAPI dependency that reads the limit and cursor query parameters of a listing endpoint"""
+    try:
+        after = decode_cursor(cursor) if cursor else None
+
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return Page(limit=limit, after=after)
+
+
+def keyset_condition(sort_column, id_column, after: list, descending: bool = False):
+    """
+    Returns the WHERE condition selecting the rows after (sort value, id) in the order
+    `sort_column [DESC], id_column [DESC]`. The pair is compared as a row, (sort, id) > (value, id),
+    which Postgres serves as a single index range scan. A None sort value is a cursor inside the
+    NULL tail of a nullable sort column (see paginate), where only the id decides.
+    """
+    if sort_column is id_column:
+        return id_column < after[0] if descending else id_column > after[0]
+
+    value, last_id = after
+    if value is None:
+        return and_(sort_column.is_(None), id_column < last_id if descending else id_column > last_id)
+
+    keyset, cursor = tuple_(sort_column, id_column), tuple_(value, last_id)
+    return keyset < cursor if descending else keyset > cursor
+
+
+def cursor_value_matches(column, value, nullable: bool = False) -> bool:
+    """
+    Tells whether a decoded cursor value can be compared with the column, so that a cursor of
+    another sort order (or a forged one) is answered with a 400 rather than a db error
+    """
+    if value is None:
+        return nullable
+
+    try:
+        python_type = column.type.python_type
+
+    except NotImplementedError:
+        return True
+
+    if python_type is int:
+        bound = 2 ** 63 if isinstance(column.type, BigInteger) else 2 ** 31
+        return type(value) is int and -bound <= value < bound
+
+    if python_type is date:
+        return type(value) is date
+
+    return isinstance(value, python_type)
+
+
+async def _fetch(session: AsyncSession, statement: Select, mappings: bool) -> list:
+    if mappings:
+        return list((await session.execute(statement)).mappings().all())
+
+    return list((await session.scalars(statement)).all())
+
+
+async def paginate(
+        session: AsyncSession, statement: Select, sort_column, id_column, page: Page, descending: bool = False,
+        mappings: bool = False
+    ) -> dict:
+    """
+    Runs an ORM select one keyset page at a time. Returns the rows and the next_cursor
+    (None on the last page), or an error dict for a cursor that doesn't match the sort order.
+    With mappings=True the statement selects columns and the rows are returned as mappings,
+    the sort and id columns must then be selected under their own names.
+    A nullable sort column takes a second statement on the page where its NULL tail starts.
+    """
+    nullable = sort_column is not id_column and sort_column.nullable
+    conditions = []
+    if page.after is not None:
+        if len(page.after) != (1 if sort_column is id_column else 2):
+            return {"error": "Cursor doesn't match the requested sort order", "status_code": 400}
+
+        *sort_value, last_id = page.after
+        if not cursor_value_matches(id_column, last_id) or not all(
+            cursor_value_matches(sort_column, value, nullable=nullable) for value in sort_value
+        ):
+            return {"error": "Invalid cursor", "status_code": 400}
+
+        conditions.append(keyset_condition(sort_column, id_column, page.after, descending))
+
+    ordered = (lambda column: column.desc()) if descending else (lambda column: column.asc())
+    order_by = [ordered(id_column)] if sort_column is id_column else [ordered(sort_column), ordered(id_column)]
+
+    # One extra row tells whether there is a next page without a COUNT query
+    limit = page.limit + 1
+    if not nullable:
+        rows = await _fetch(session, statement.where(*conditions).order_by(*order_by).limit(limit), mappings)
+    else:
+        # NULL sort values come last in both directions, as a phase of their own ordered by id, so
+        # that each phase is an index range scan. Only the page that crosses over runs both.
+        rows = []
+        in_null_tail = page.after is not None and page.after[0] is None
+        if not in_null_tail:
+            values = statement.where(sort_column.is_not(None), *conditions).order_by(*order_by).limit(limit)
+            rows = await _fetch(session, values, mappings)
+
+        if len(rows) < limit:
+            tail_conditions = conditions if in_null_tail else [sort_column.is_(None)]
+            tail = statement.where(*tail_conditions).order_by(ordered(id_column)).limit(limit - len(rows))
+            rows += await _fetch(session, tail, mappings)
+
+    next_cursor = None
+    if len(rows) > page.limit:
+        rows = rows[:page.limit]
+        last = rows[-1]
+        value_of = (lambda column: last[column.key]) if mappings else (lambda column: getattr(last, column.key))
+        keyset = [value_of(id_column)]
+        if sort_column is not id_column:
+            keyset.insert(0, value_of(sort_column))
+        next_cursor = encode_cursor(keyset)
+
+    return {"rows": rows, "next_cursor": next_cursor, "status_code": 200}
+
+
+def page_response(
+        rows: list, count_key: str, items_key: str, fields: list, next_cursor: Optional[str] = None,
+        headers: Optional[dict] = None
+    ) -> ORJSONResponse:
+    """
+    Builds a listing response straight from row mappings and serializes it once with orjson,
+    which encodes dates and enums natively. Returning a Response skips FastAPI's response_model
+    validation and jsonable_encoder pass, the response_model of the route still documents the shape.
+    """
+    items = [{field: row[field] for field in fields} for row in rows]
+    return ORJSONResponse({count_key: len(items), items_key: items, "next_cursor": next_cursor}, headers=headers)
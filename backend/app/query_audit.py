@@ -0,0 +1,183 @@
+# Standard Imports
+import os
+import sys
+import time
+import logging
+from collections import Counter
+from contextvars import ContextVar
+from typing import List, NamedTuple, Optional
+
+# Third-Party Imports
+from greenlet import getcurrent
+from sqlalchemy import event
+
+# Local Imports
+from config_file import QUERY_AUDIT_STRICT, QUERY_AUDIT_SLOW_SECONDS, QUERY_AUDIT_N_PLUS_ONE, QUERY_AUDIT_DEFAULT_BUDGET
+from backend.app.metrics import route_template
+
+logger = logging.getLogger(__name__)
+
+# Statements beyond which a request fails in strict mode, keyed by (method, route template)
+QUERY_BUDGETS = {
+    ("POST", "/api/task/create"): 1,
+    ("POST", "/api/task/batch"): 4,
+    ("POST", "/api/task/import"): 5,
+    ("PATCH", "/api/task/{task_id}"): 3,
+    ("DELETE", "/api/task/{task_id}"): 2,
+    ("GET", "/api/task/task_id/{task_id}"): 2,
+    ("GET", "/api/task/all/"): 2,
+    ("GET", "/api/task/export"): 1,
+    ("GET", "/api/task/summary"): 2,
+    ("GET", "/api/task/query"): 3, # sorted by due_date, the page reaching the NULL due dates reads both phases
+    ("GET", "/api/task/tag/{tag}"): 2,
+    ("GET", "/api/task/status/"): 2,
+    ("GET", "/api/task/priority/"): 2,
+    ("GET", "/api/task/text/"): 2,
+    ("GET", "/api/task/tags/"): 2,
+    ("GET", "/api/task/{task_id}/tags"): 3,
+    ("POST", "/api/task/{task_id}/tags"): 3,
+    ("DELETE", "/api/task/{task_id}/tags/{tag}"): 3,
+    ("GET", "/api/tag/all"): 2,
+    ("POST", "/api/tag/create"): 2,
+    ("DELETE", "/api/tag/{tag}"): 3,
+    ("PATCH", "/api/tag/{tag}"): 4,
+    ("GET", "/api/admin/{user_id}"): 1,
+    ("GET", "/api/admin/all/"): 1,
+    ("GET", "/api/admin/recently_active/"): 1,
+    ("GET", "/api/admin/stats/"): 2,
+    ("DELETE", "/api/admin/{user_id}"): 2,
+}
+
+# Frames of this file are reported as the call site of a statement
+DATA_LAYER_FILE = os.path.join("app", "database.py")
+
+# Statements of the request being served, None outside of requests (background jobs)
+_STATEMENTS: ContextVar[Optional[list]] = ContextVar("query_audit_statements", default=None)
+
+
+class QueryBudgetExceeded(Exception):
+    """Raised in strict mode when a request issues more statements than its budget"""
+
+
+class Statement(NamedTuple):
+    sql: str
+    parameters: str
+    elapsed: float
+    call_site: str
+
+
+def call_site() -> str:
+    """
+    Returns the database.py method (and line) that issued the statement being executed.
+    Cursor events run in the greenlet SQLAlchemy spawns for the sync core, so the walk continues
+    in the parent greenlet, which is suspended inside the awaiting coroutines.
+    """
+    frame, current = sys._getframe(1), getcurrent()
+    while True:
+        while frame is not None:
+            code = frame.f_code
+            if code.co_filename.endswith(DATA_LAYER_FILE):
+                return f"{getattr(code, 'co_qualname', code.co_name)}:{frame.f_lineno}"
+            frame = frame.f_back
+
+        current = current.parent
+        if current is None:
+            return "unknown"
+        frame = current.gr_frame
+
+
+def explain(conn, statement: str, parameters) -> str:
+    """EXPLAINs a statement on the connection that ran it, in a savepoint so a failure can't abort the transaction"""
+    conn.info["query_audit_explaining"] = True
+    try:
+        with conn.begin_nested():
+            return "\n".join(row[0] for row in conn.exec_driver_sql(f"EXPLAIN {statement}", parameters))
+
+    except Exception as e:
+        return f"EXPLAIN failed - {e}"
+
+    finally:
+        conn.info["query_audit_explaining"] = False
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context.query_audit_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context.query_audit_start
+    statements = _STATEMENTS.get()
+    if statements is None or conn.info.get("query_audit_explaining"):
+        return
+
+    site = call_site()
+    statements.append(Statement(statement, repr(parameters), elapsed, site))
+
+    if elapsed >= QUERY_AUDIT_SLOW_SECONDS:
+        # Server side cursors are still open here, the connection can't run another statement
+        streaming = context.execution_options.get("stream_results")
+        plan = "not available (executemany or streamed)" if executemany or streaming else explain(conn, statement, parameters)
+        logger.warning("Slow statement %.1f ms at %s\n%s\n%s", elapsed * 1000, site, statement, plan)
+
+
+def install_query_audit(engine) -> None:
+    """Records the statements of a (sync) engine per request, called once per engine when QUERY_AUDIT is on"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def audit(method: str, route: str, statements: List[Statement]) -> Optional[str]:
+    """
+    Logs the statements of a request and flags repeated identical statements and N+1 patterns
+    (the same SQL run QUERY_AUDIT_N_PLUS_ONE times or more with different parameters).
+    Returns the budget violation, if any.
+    """
+    logger.debug(
+        "%s %s issued %d statements in %.1f ms\n%s", method, route, len(statements),
+        sum(statement.elapsed for statement in statements) * 1000,
+        "\n".join(f"  {s.elapsed * 1000:7.2f} ms  {s.call_site}  {s.sql}" for s in statements)
+    )
+
+    sites = {statement.sql: statement.call_site for statement in statements}
+    for (sql, parameters), count in Counter((s.sql, s.parameters) for s in statements).items():
+        if count > 1:
+            logger.warning("%s %s repeated an identical statement %d times at %s\n%s", method, route, count, sites[sql], sql)
+
+    for sql, count in Counter(statement.sql for statement in statements).items():
+        if count >= QUERY_AUDIT_N_PLUS_ONE:
+            logger.warning("%s %s looks like N+1, %d statements at %s\n%s", method, route, count, sites[sql], sql)
+
+    budget = QUERY_BUDGETS.get((method, route), QUERY_AUDIT_DEFAULT_BUDGET)
+    if len(statements) > budget:
+        violation = f"{method} {route} issued {len(statements)} statements, its budget is {budget}"
+        logger.error(violation)
+        return violation
+
+    return None
+
+
+class QueryAuditMiddleware:
+    """
+    Pure ASGI middleware, only added when QUERY_AUDIT is on. Collects the statements each request
+    issues and audits them once the response is sent. It is added inside AuthMiddleware, so the
+    budgets only count the statements of the route. In strict mode a request over its budget
+    raises QueryBudgetExceeded, which a test client re-raises and fails the test with.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        statements = []
+        token = _STATEMENTS.set(statements)
+        try:
+            await self.app(scope, receive, send)
+
+        finally:
+            _STATEMENTS.reset(token)
+
+        violation = audit(scope["method"], route_template(scope), statements)
+        if violation and QUERY_AUDIT_STRICT:
+            raise QueryBudgetExceeded(violation)
@@ -1,11 +1,20 @@
-from sqlalchemy import Column, Integer, String, Text, TIMESTAMP, DATE, ForeignKey, Enum, func
-from sqlalchemy.orm import relationship
+from sqlalchemy import (
+    Column, Integer, BigInteger, String, Text, TIMESTAMP, DATE, ForeignKey, Enum, Index, UniqueConstraint, Computed, func, text,
+    MetaData, Table
+)
+from sqlalchemy.orm import relationship, deferred
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.ext.declarative import declarative_base
 
 import enum
 
 Base = declarative_base()
 
+# Text searched by /api/task/text/, shared by the generated tsvector column, the trigram index and
+# the queries in database.py (an expression index is only used when the query repeats it verbatim)
+TASK_SEARCH_CONFIG = "english"
+TASK_SEARCH_TEXT = "(coalesce(title, '') || ' ' || coalesce(description, ''))"
+
 # Enum Definitions
 class TaskStatus(enum.Enum):
     Pending = "Pending"
@@ -38,9 +47,15 @@ class User(Base):
     user_id = Column(Integer, primary_key=True, autoincrement=True)
     username = Column(String(255), unique=True, nullable=False)
     password_hash = Column(String(255), nullable=False)
+    token_version = Column(Integer, server_default='0', nullable=False) # bumped to invalidate all issued tokens
+    data_version = Column(BigInteger, server_default='0', nullable=False) # bumped by triggers on every task/tag write
     created_at = Column(TIMESTAMP, server_default=func.now(), nullable=False)
     updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now(), nullable=False)
 
+    __table_args__ = (
+        Index('ix_users_updated_at_user_id', 'updated_at', 'user_id'), # recently active users, in keyset order
+    )
+
     # Relationship to access tasks of the user
     tasks = relationship('Task', back_populates='user', cascade='all, delete-orphan')
 
@@ -56,6 +71,10 @@ class Tag(Base):
     user_id = Column(Integer, ForeignKey('users.user_id', ondelete='CASCADE'), nullable=False)
     tag = Column(String(255), nullable=False)
 
+    __table_args__ = (
+        UniqueConstraint('user_id', 'tag', name='uq_tags_user_id_tag'), # get_tag and tag listings
+    )
+
     # Relationship to access tasks of the tag
     tasks = relationship('Task', back_populates='tag_relation')
 
@@ -78,6 +97,29 @@ class Task(Base):
     status = Column(Enum(TaskStatus), default=TaskStatus.Pending.value, nullable=False)
     created_at = Column(TIMESTAMP, server_default=func.now(), nullable=False)
     updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now(), nullable=False)
+    # Maintained by Postgres, deferred so that task listings don't load it
+    search_vector = deferred(Column(
+        TSVECTOR, Computed(f"to_tsvector('{TASK_SEARCH_CONFIG}'::regconfig, {TASK_SEARCH_TEXT})", persisted=True)
+    ))
+
+    # One index per access path of TaskData, each ending in task_id for the keyset pagination
+    __table_args__ = (
+        Index('ix_tasks_user_id_task_id', 'user_id', 'task_id'),
+        Index('ix_tasks_user_id_status_task_id', 'user_id', 'status', 'task_id'),
+        Index('ix_tasks_user_id_priority_task_id', 'user_id', 'priority', 'task_id'),
+        Index('ix_tasks_user_id_tag_task_id', 'user_id', 'tag', 'task_id'),
+        Index('ix_tasks_user_id_due_date_task_id', 'user_id', 'due_date', 'task_id'),
+        Index('ix_tasks_user_id_title_task_id', 'user_id', 'title', 'task_id'),
+        Index('ix_tasks_tag_id_task_id', 'tag_id', 'task_id'), # also serves the ON DELETE SET NULL of tags
+        # Overdue sweeper, only the Pending tasks are indexed
+        Index('ix_tasks_due_date_pending', 'due_date', postgresql_where=text("status = 'Pending'")),
+        # Text search, btree_gin lets user_id lead both GIN indexes
+        Index('ix_tasks_user_id_search_vector', 'user_id', 'search_vector', postgresql_using='gin'),
+        Index(
+            'ix_tasks_user_id_search_text_trgm', 'user_id', text(f"{TASK_SEARCH_TEXT} gin_trgm_ops"),
+            postgresql_using='gin'
+        ),
+    )
 
     # Relationship to the User model
     user = relationship('User', back_populates='tasks')
@@ -89,8 +131,58 @@ class Task(Base):
         return f"<Task(task_id={self.task_id}, title={self.title}, status={self.status}, tag={self.tag_id})>"
 
 
+# Task Tags, every tag of a task. tasks.tag_id is the primary tag and a trigger keeps its link here
+# (see the task_tags migration). The primary key serves the all/any tags queries, one range per tag.
+class TaskTag(Base):
+    __tablename__ = 'task_tags'
+
+    user_id = Column(Integer, ForeignKey('users.user_id', ondelete='CASCADE'), primary_key=True)
+    tag_id = Column(Integer, ForeignKey('tags.tag_id', ondelete='CASCADE'), primary_key=True)
+    task_id = Column(Integer, ForeignKey('tasks.task_id', ondelete='CASCADE'), primary_key=True)
+
+    __table_args__ = (
+        Index('ix_task_tags_task_id_tag_id', 'task_id', 'tag_id'), # tags of a task, cascades from tasks
+    )
+
+    def __repr__(self):
+        return f"<TaskTag(task_id={self.task_id}, tag_id={self.tag_id})>"
+
+
+# Task Counters, one row per (user, dimension, value), e.g. (1, 'status', 'Pending', 5).
+# Kept exact by the statement level triggers on tasks and task_tags (see the task_counters migrations),
+# so they also follow bulk statements and cascades. Dimensions: total ('all'), status, priority and
+# tag, whose value is the tag_id so that renaming a tag doesn't touch its counter.
+class TaskCounter(Base):
+    __tablename__ = 'task_counters'
+
+    user_id = Column(Integer, ForeignKey('users.user_id', ondelete='CASCADE'), primary_key=True)
+    dimension = Column(String(16), primary_key=True)
+    value = Column(String(255), primary_key=True)
+    count = Column(Integer, server_default='0', nullable=False)
+
+    def __repr__(self):
+        return f"<TaskCounter(user_id={self.user_id}, {self.dimension}={self.value}, count={self.count})>"
+
+
 class RevokedToken(Base):
     __tablename__ = 'revoked_tokens'
 
     id = Column(Integer, primary_key=True, autoincrement=True)
-    token = Column(String(255), nullable=False)
+    jti = Column(String(32), nullable=False, unique=True, index=True) # uuid4 hex of the revoked JWT
+    expires_at = Column(TIMESTAMP(timezone=True), nullable=False, index=True) # exp of the revoked JWT
+
+
+# Staging table of /api/task/import, created per import and dropped on commit. It lives outside
+# Base.metadata so that Alembic never sees it.
+task_import = Table(
+    'task_import', MetaData(),
+    Column('line', Integer, nullable=False),
+    Column('title', String(255), nullable=False),
+    Column('description', Text),
+    Column('tag', String(255)),
+    Column('due_date', DATE),
+    Column('priority', String(16), nullable=False),
+    Column('status', String(16), nullable=False),
+    prefixes=['TEMPORARY'],
+    postgresql_on_commit='DROP'
+)
@@ -2,10 +2,14 @@
 from datetime import datetime
 
 # Third-Party Imports
-from fastapi import Depends, HTTPException, APIRouter
+from fastapi import Depends, HTTPException, APIRouter, Request
+from sqlalchemy.ext.asyncio import AsyncSession
 
 # Local Imports
-from backend.auth_utils import get_current_user, raise_exception
+from backend.app.utils import get_session
+from backend.app.pagination import Page, get_page, page_response
+from backend.app.etag import check_etag
+from backend.auth_utils import get_current_user
 from backend.app.database import TagData
 from backend.app.schemas import User
 from backend.app.models import TagResponse, TagsResponse
@@ -13,23 +17,23 @@ from backend.app.models import TagResponse, TagsResponse
 router = APIRouter()
 
 @router.get("/all", response_model=TagsResponse, status_code=200)
-@raise_exception
-async def get_all_tags(current_user: dict = Depends(get_current_user)):
-    """Returns all tags for the current user"""
-    tags = TagData().get_all_tags(user_id=current_user["user"].user_id)
-    if not tags:
-       return TagsResponse(tag_count=0, tags=[])
+async def get_all_tags(request: Request, page: Page = Depends(get_page), current_user: dict = Depends(get_current_user), session: AsyncSession = Depends(get_session, scope="function")):
+    """Returns a page of tags for the current user ordered by name"""
+    headers = await check_etag(request, session, current_user["user"].user_id)
+    response = await TagData(session).get_all_tags(user_id=current_user["user"].user_id, page=page)
+    if "error" in response:
+        raise HTTPException(status_code=response["status_code"], detail=response["error"])
     
-    tags = [TagResponse(**tag.__dict__) for tag in tags]
-
-    return TagsResponse(tag_count=len(tags), tags=tags)
+    return page_response(
+        response["rows"], "tag_count", "tags", list(TagResponse.model_fields), next_cursor=response["next_cursor"],
+        headers=headers
+    )
 
 
 @router.post("/create", status_code=201)
-@raise_exception
-async def create_tag(tag: str, current_user: dict = Depends(get_current_user)):
+async def create_tag(tag: str, current_user: dict = Depends(get_current_user), session: AsyncSession = Depends(get_session, scope="function")):
     """Creates a new tag for the current user"""
-    response = TagData().add_tag(user_id=current_user["user"].user_id, tag=tag)
+    response = await TagData(session).add_tag(user_id=current_user["user"].user_id, tag=tag)
     if "error" in response:
         raise HTTPException(status_code=response["status_code"], detail=response["error"])
     
@@ -37,10 +41,9 @@ async def create_tag(tag: str, current_user: dict = Depends(get_current_user)):
 
 
 @router.delete("/{tag}", status_code=200)
-@raise_exception
-async def delete_tag(tag: str, current_user: dict = Depends(get_current_user)):
+async def delete_tag(tag: str, current_user: dict = Depends(get_current_user), session: AsyncSession = Depends(get_session, scope="function")):
     """Deletes a tag for the current user"""
-    response = TagData().delete_tag(user_id=current_user["user"].user_id, tag=tag)
+    response = await TagData(session).delete_tag(user_id=current_user["user"].user_id, tag=tag)
     if "error" in response:
         raise HTTPException(status_code=response["status_code"], detail=response["error"])
     
@@ -48,10 +51,9 @@ async def delete_tag(tag: str, current_user: dict = Depends(get_current_user)):
 
 
 @router.patch("/{tag}", status_code=200)
-@raise_exception
-async def update_tag(tag: str, new_tag: str, current_user: dict = Depends(get_current_user)):
+async def update_tag(tag: str, new_tag: str, current_user: dict = Depends(get_current_user), session: AsyncSession = Depends(get_session, scope="function")):
     """Updates a tag for the current user"""
-    response = TagData().update_tag(user_id=current_user["user"].user_id, tag=tag, new_tag=new_tag)
+    response = await TagData(session).update_tag(user_id=current_user["user"].user_id, tag=tag, new_tag=new_tag)
     if "error" in response:
         raise HTTPException(status_code=response["status_code"], detail=response["error"])
     
@@ -1,27 +1,43 @@
 # Standard Imports
-from datetime import datetime
+import enum
+from datetime import datetime, date
+from typing import List
 
 # Third-Party Imports
-from fastapi import Depends, HTTPException, APIRouter, Header
+from fastapi import Depends, HTTPException, APIRouter, Header, Query, UploadFile, File, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 
 # Local Imports
-from backend.auth_utils import get_current_user, raise_exception
+from config_file import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, IMPORT_MAX_ERRORS
+from backend.app.utils import get_session
+from backend.app.pagination import Page, get_page, page_response
+from backend.app.etag import check_etag
+from backend.auth_utils import get_current_user
 from backend.app.database import TaskData
+from backend.app.export import export_tasks
+from backend.app.bulk_import import TaskImport
 from backend.app.schemas import TaskStatus, TaskPriority
-from backend.app.models import TaskResponse, TasksResponse, CreateTaskRequest, UpdateTaskRequest
+from backend.app.models import (
+    TaskResponse, TasksResponse, CreateTaskRequest, UpdateTaskRequest, TaskSortKey, SortOrder,
+    BatchTaskRequest, BatchTaskResponse, TaskFileFormat, ImportResponse, TaskSummaryResponse,
+    TagMatch, TaskTagsRequest, TaskTagsResponse
+)
 
 router = APIRouter()
 
+TASK_FIELDS = list(TaskResponse.model_fields)
 
-@router.post("/create", status_code=201)
-@raise_exception
+
+@router.post("/create", response_model=TaskResponse, status_code=201)
 async def create_task(
         request: CreateTaskRequest,
-        current_user: dict = Depends(get_current_user)
+        current_user: dict = Depends(get_current_user),
+        session: AsyncSession = Depends(get_session, scope="function")
     ):
-    """Creates a new task for the current user"""
+    """Creates a new task for the current user and returns it"""
     priority = request.priority.value if request.priority else None
-    response = TaskData().create_task(
+    response = await TaskData(session).create_task(
         user_id=current_user["user"].user_id, title=request.title, description=request.description, 
         tag=request.tag, due_date=request.due_date, priority=priority
     )
@@ -29,20 +45,70 @@ async def create_task(
     if "error" in response:
         raise HTTPException(status_code=response["status_code"], detail=response["error"])
     
-    return response
+    return TaskResponse(**response["task"])
+
+
+@router.post("/batch", response_model=BatchTaskResponse, status_code=200)
+async def batch_tasks(
+        request: BatchTaskRequest,
+        current_user: dict = Depends(get_current_user),
+        session: AsyncSession = Depends(get_session, scope="function")
+    ):
+    """
+    Creates, updates and deletes many tasks of the current user in one transaction.
+    Returns the outcome of every operation, in the order of the request.
+    """
+    operations = [
+        {
+            "op": operation.op,
+            "task_id": getattr(operation, "task_id", None),
+            "data": {
+                key: value.value if isinstance(value, enum.Enum) else value
+                for key, value in operation.data.model_dump(exclude_none=True).items()
+            } if hasattr(operation, "data") else {}
+        }
+        for operation in request.operations
+    ]
+    response = await TaskData(session).apply_task_batch(user_id=current_user["user"].user_id, operations=operations)
+    if "error" in response:
+        raise HTTPException(status_code=response["status_code"], detail=response["error"])
+
+    return BatchTaskResponse(results=response["results"])
+
+
+@router.post("/import", response_model=ImportResponse, status_code=200)
+async def import_tasks(
+        file: UploadFile = File(...),
+        format: TaskFileFormat = TaskFileFormat.ndjson,
+        current_user: dict = Depends(get_current_user),
+        session: AsyncSession = Depends(get_session, scope="function")
+    ):
+    """
+    Imports the tasks of an NDJSON or CSV file (fields of the create endpoint plus status) with COPY.
+    Invalid rows and rows with an unknown tag are skipped and reported, the rest are imported.
+    """
+    user_id = current_user["user"].user_id
+    task_import = TaskImport(file.file, import_format=format.value)
+    response = await TaskData(session).import_tasks(
+        user_id=user_id, records=task_import.records(), max_errors=IMPORT_MAX_ERRORS
+    )
+    if "error" in response:
+        raise HTTPException(status_code=response["status_code"], detail=response["error"])
+
+    return ImportResponse(**task_import.report(user_id=user_id, response=response))
 
 
 @router.patch("/{task_id}", status_code=200)
-@raise_exception
 async def update_task(
         task_id: int,
         request: UpdateTaskRequest,
-        current_user: dict = Depends(get_current_user)
+        current_user: dict = Depends(get_current_user),
+        session: AsyncSession = Depends(get_session, scope="function")
     ):
     """Updates the task with the new title, description, status and tag if the task exists"""
     priority = request.priority.value if request.priority else None
     status = request.status.value if request.status else None
-    response = TaskData().update_task(
+    response = await TaskData(session).update_task(
         user_id=current_user["user"].user_id, task_id=task_id, title=request.title, 
         description=request.description, tag=request.tag, due_date=request.due_date, 
         priority=priority, status=status
@@ -54,10 +120,9 @@ async def update_task(
 
 
 @router.delete("/{task_id}", status_code=200)
-@raise_exception
-async def delete_task(task_id: int, current_user: dict = Depends(get_current_user)):
+async def delete_task(task_id: int, current_user: dict = Depends(get_current_user), session: AsyncSession = Depends(get_session, scope="function")):
     """Deletes a task for the current user"""
-    response = TaskData().delete_task(user_id=current_user["user"].user_id, task_id=task_id)
+    response = await TaskData(session).delete_task(user_id=current_user["user"].user_id, task_id=task_id)
     if "error" in response:
         raise HTTPException(status_code=response["status_code"], detail=response["error"])
     
@@ -65,77 +130,193 @@ async def delete_task(task_id: int, current_user: dict = Depends(get_current_use
 
 
 @router.get("/task_id/{task_id}", response_model=TaskResponse, status_code=200)
-@raise_exception
-async def get_task(task_id: int, current_user: dict = Depends(get_current_user)):
+async def get_task(request: Request, http_response: Response, task_id: int, current_user: dict = Depends(get_current_user), session: AsyncSession = Depends(get_session, scope="function")):
     """Returns a task for a given task_id if the task exists"""
-    task = TaskData().get_task(user_id=current_user["user"].user_id, task_id=task_id)
+    headers = await check_etag(request, session, current_user["user"].user_id)
+    task = await TaskData(session).get_task(user_id=current_user["user"].user_id, task_id=task_id)
     if not task:
         raise HTTPException(status_code=404, detail=f"Task:{task_id} not found for User:{current_user['user'].user_id}")
     
+    http_response.headers.update(headers)
     return task
 
 
 @router.get("/all/", response_model=TasksResponse, status_code=200)
-@raise_exception
-async def get_tasks(current_user: dict = Depends(get_current_user)):
-    """Returns all tasks for a given user"""
-    tasks = TaskData().get_all_tasks(user_id=current_user["user"].user_id)
-    if not tasks:
-        return TasksResponse(task_count=0,tasks=[])
+async def get_tasks(request: Request, page: Page = Depends(get_page), current_user: dict = Depends(get_current_user), session: AsyncSession = Depends(get_session, scope="function")):
+    """Returns a page of tasks for a given user, pass next_cursor back as cursor for the next one"""
+    headers = await check_etag(request, session, current_user["user"].user_id)
+    response = await TaskData(session).get_all_tasks(user_id=current_user["user"].user_id, page=page)
+    if "error" in response:
+        raise HTTPException(status_code=response["status_code"], detail=response["error"])
     
-    tasks = [TaskResponse(**task.__dict__) for task in tasks]
+    return page_response(response["rows"], "task_count", "tasks", TASK_FIELDS, next_cursor=response["next_cursor"], headers=headers)
 
-    return TasksResponse(task_count=len(tasks), tasks=tasks)
 
+@router.get("/export", status_code=200)
+async def export_all_tasks(
+        format: TaskFileFormat = TaskFileFormat.ndjson,
+        current_user: dict = Depends(get_current_user)
+    ):
+    """
+    Streams every task of the current user as NDJSON or CSV, memory use doesn't grow with the account.
+    The stream reads through its own session, no request session is held open while it is sent.
+    """
+    media_type = "text/csv" if format == TaskFileFormat.csv else "application/x-ndjson"
+    return StreamingResponse(
+        export_tasks(user_id=current_user["user"].user_id, export_format=format.value),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="tasks.{format.value}"'}
+    )
 
-@router.get("/tag/{tag}", response_model=TasksResponse, status_code=200)
-@raise_exception
-async def get_tasks_by_tag(tag: str, current_user: dict = Depends(get_current_user)):
-    """Retrieves all tasks for a given user filtered by a specific tag"""
-    tasks = TaskData().get_tasks_by_tag(user_id=current_user["user"].user_id, tag=tag)
-    if not tasks:
-        return TasksResponse(task_count=0,tasks=[])
+
+@router.get("/summary", response_model=TaskSummaryResponse, status_code=200)
+async def get_task_summary(request: Request, http_response: Response, current_user: dict = Depends(get_current_user), session: AsyncSession = Depends(get_session, scope="function")):
+    """Returns how many tasks the current user has in total, by status, by priority and by tag"""
+    headers = await check_etag(request, session, current_user["user"].user_id)
+    response = await TaskData(session).get_task_summary(user_id=current_user["user"].user_id)
+    if "error" in response:
+        raise HTTPException(status_code=response["status_code"], detail=response["error"])
+
+    http_response.headers.update(headers)
+    return TaskSummaryResponse(**response)
+
+
+@router.get("/query", response_model=TasksResponse, status_code=200)
+async def query_tasks(
+        request: Request,
+        status: List[TaskStatus] = Query(None),
+        priority: List[TaskPriority] = Query(None),
+        tag: str | None = None,
+        due_after: date | None = None,
+        due_before: date | None = None,
+        text: str | None = None,
+        sort: TaskSortKey = TaskSortKey.task_id,
+        order: SortOrder = SortOrder.asc,
+        page: Page = Depends(get_page),
+        current_user: dict = Depends(get_current_user),
+        session: AsyncSession = Depends(get_session, scope="function")
+    ):
+    """
+    Returns a page of tasks for the current user matching every given filter, status and priority
+    may be repeated to match any of several values and due_after/due_before are inclusive
+    """
+    headers = await check_etag(request, session, current_user["user"].user_id)
+    response = await TaskData(session).query_tasks(
+        user_id=current_user["user"].user_id, page=page,
+        status=[s.value for s in status] if status else None,
+        priority=[p.value for p in priority] if priority else None,
+        tag=tag, due_after=due_after, due_before=due_before, text=text,
+        sort=sort.value, descending=order == SortOrder.desc
+    )
+    if "error" in response:
+        raise HTTPException(status_code=response["status_code"], detail=response["error"])
     
-    tasks = [TaskResponse(**task.__dict__) for task in tasks]
+    return page_response(response["rows"], "task_count", "tasks", TASK_FIELDS, next_cursor=response["next_cursor"], headers=headers)
+
 
-    return TasksResponse(task_count=len(tasks), tasks=tasks)
+@router.get("/tag/{tag}", response_model=TasksResponse, status_code=200)
+async def get_tasks_by_tag(request: Request, tag: str, page: Page = Depends(get_page), current_user: dict = Depends(get_current_user), session: AsyncSession = Depends(get_session, scope="function")):
+    """Retrieves a page of tasks for a given user filtered by a specific tag"""
+    headers = await check_etag(request, session, current_user["user"].user_id)
+    response = await TaskData(session).get_tasks_by_tag(user_id=current_user["user"].user_id, tag=tag, page=page)
+    if "error" in response:
+        raise HTTPException(status_code=response["status_code"], detail=response["error"])
+    
+    return page_response(response["rows"], "task_count", "tasks", TASK_FIELDS, next_cursor=response["next_cursor"], headers=headers)
 
 
 @router.get("/status/", response_model=TasksResponse, status_code=200)
-@raise_exception
-async def get_tasks_by_status(status: TaskStatus, current_user: dict = Depends(get_current_user)):
-    """Retrieves all tasks for a given user filtered by a specific status"""
-    tasks = TaskData().get_tasks_by_status(user_id=current_user["user"].user_id, status=status.value)
-    if not tasks:
-        return TasksResponse(task_count=0,tasks=[])
+async def get_tasks_by_status(request: Request, status: TaskStatus, page: Page = Depends(get_page), current_user: dict = Depends(get_current_user), session: AsyncSession = Depends(get_session, scope="function")):
+    """Retrieves a page of tasks for a given user filtered by a specific status"""
+    headers = await check_etag(request, session, current_user["user"].user_id)
+    response = await TaskData(session).get_tasks_by_status(user_id=current_user["user"].user_id, status=status.value, page=page)
+    if "error" in response:
+        raise HTTPException(status_code=response["status_code"], detail=response["error"])
     
-    tasks = [TaskResponse(**task.__dict__) for task in tasks]
-
-    return TasksResponse(task_count=len(tasks), tasks=tasks)
+    return page_response(response["rows"], "task_count", "tasks", TASK_FIELDS, next_cursor=response["next_cursor"], headers=headers)
 
 
 
 @router.get("/priority/", response_model=TasksResponse, status_code=200)
-@raise_exception
-async def get_tasks_by_priority(priority: TaskPriority, current_user: dict = Depends(get_current_user)):
-    """Retrieves all tasks for a given user filtered by a specific priority"""
-    tasks = TaskData().get_tasks_by_priority(user_id=current_user["user"].user_id, priority=priority.value)
-    if not tasks:
-        return TasksResponse(task_count=0,tasks=[])
+async def get_tasks_by_priority(request: Request, priority: TaskPriority, page: Page = Depends(get_page), current_user: dict = Depends(get_current_user), session: AsyncSession = Depends(get_session, scope="function")):
+    """Retrieves a page of tasks for a given user filtered by a specific priority"""
+    headers = await check_etag(request, session, current_user["user"].user_id)
+    response = await TaskData(session).get_tasks_by_priority(user_id=current_user["user"].user_id, priority=priority.value, page=page)
+    if "error" in response:
+        raise HTTPException(status_code=response["status_code"], detail=response["error"])
     
-    tasks = [TaskResponse(**task.__dict__) for task in tasks]
-
-    return TasksResponse(task_count=len(tasks), tasks=tasks)
+    return page_response(response["rows"], "task_count", "tasks", TASK_FIELDS, next_cursor=response["next_cursor"], headers=headers)
 
 
 @router.get("/text/", response_model=TasksResponse, status_code=200)
-@raise_exception
-async def search_tasks_by_text(text: str, current_user: dict = Depends(get_current_user)):
-    """Returns all tasks for a user by searching for a sub sting in the title or description"""
-    tasks = TaskData().search_tasks_by_text(user_id=current_user["user"].user_id, text=text)
-    if not tasks:
-        return TasksResponse(task_count=0,tasks=[])
+async def search_tasks_by_text(
+        request: Request,
+        text: str = Query(..., min_length=1),
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        current_user: dict = Depends(get_current_user),
+        session: AsyncSession = Depends(get_session, scope="function")
+    ):
+    """Returns the tasks of a user matching the text in the title or description, most relevant first"""
+    headers = await check_etag(request, session, current_user["user"].user_id)
+    response = await TaskData(session).search_tasks_by_text(user_id=current_user["user"].user_id, text=text, limit=limit)
+    if "error" in response:
+        raise HTTPException(status_code=response["status_code"], detail=response["error"])
     
-    tasks = [TaskResponse(**task.__dict__) for task in tasks]
+    return page_response(response["rows"], "task_count", "tasks", TASK_FIELDS, headers=headers)
+
+
+@router.get("/tags/", response_model=TasksResponse, status_code=200)
+async def get_tasks_by_tags(
+        request: Request,
+        tags: List[str] = Query(..., min_length=1),
+        match: TagMatch = TagMatch.all,
+        page: Page = Depends(get_page),
+        current_user: dict = Depends(get_current_user),
+        session: AsyncSession = Depends(get_session, scope="function")
+    ):
+    """Returns a page of tasks having all (match=all) or any (match=any) of the tags, tags may be repeated"""
+    headers = await check_etag(request, session, current_user["user"].user_id)
+    response = await TaskData(session).get_tasks_by_tags(
+        user_id=current_user["user"].user_id, tags=tags, match_all=match == TagMatch.all, page=page
+    )
+    if "error" in response:
+        raise HTTPException(status_code=response["status_code"], detail=response["error"])
+
+    return page_response(response["rows"], "task_count", "tasks", TASK_FIELDS, next_cursor=response["next_cursor"], headers=headers)
 
-    return TasksResponse(task_count=len(tasks), tasks=tasks)
+
+@router.get("/{task_id}/tags", response_model=TaskTagsResponse, status_code=200)
+async def get_task_tags(request: Request, http_response: Response, task_id: int, current_user: dict = Depends(get_current_user), session: AsyncSession = Depends(get_session, scope="function")):
+    """Returns every tag of a task of the current user"""
+    headers = await check_etag(request, session, current_user["user"].user_id)
+    response = await TaskData(session).get_task_tags(user_id=current_user["user"].user_id, task_id=task_id)
+    if "error" in response:
+        raise HTTPException(status_code=response["status_code"], detail=response["error"])
+
+    http_response.headers.update(headers)
+    return TaskTagsResponse(task_id=task_id, tags=response["tags"])
+
+
+@router.post("/{task_id}/tags", status_code=200)
+async def add_task_tags(
+        task_id: int,
+        request: TaskTagsRequest,
+        current_user: dict = Depends(get_current_user),
+        session: AsyncSession = Depends(get_session, scope="function")
+    ):
+    """Adds existing tags of the current user to a task"""
+    response = await TaskData(session).add_task_tags(user_id=current_user["user"].user_id, task_id=task_id, tags=request.tags)
+    if "error" in response:
+        raise HTTPException(status_code=response["status_code"], detail=response["error"])
+
+    return response
+
+
+@router.delete("/{task_id}/tags/{tag}", status_code=200)
+async def remove_task_tag(task_id: int, tag: str, current_user: dict = Depends(get_current_user), session: AsyncSession = Depends(get_session, scope="function")):
+    """Removes a tag from a task of the current user"""
+    response = await TaskData(session).remove_task_tag(user_id=current_user["user"].user_id, task_id=task_id, tag=tag)
+    if "error" in response:
+        raise HTTPException(status_code=response["status_code"], detail=response["error"])
+
+    return response
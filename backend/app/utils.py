@@ -1,29 +1,189 @@
 # Standard Imports
+import hmac
+import asyncio
 import hashlib
+import secrets
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, AsyncIterator, Optional, Tuple
 
 # Third-Party Imports
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, Session
+import bcrypt
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+
+# Local Imports
+from config_file import (
+    ASYNC_DB_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING,
+    PASSWORD_HASH_ROUNDS, PASSWORD_HASH_WORKERS, QUERY_AUDIT
+)
+from backend.app.metrics import TimedAsyncAdaptedQueuePool, instrument_engine
+from backend.app.query_audit import install_query_audit
+
+# Process wide registry of async engines (and their connection pools) keyed by db_url
+_ENGINES: Dict[str, AsyncEngine] = {}
+_SESSION_FACTORIES: Dict[str, async_sessionmaker] = {}
+
+
+def init_engine(db_url: str = ASYNC_DB_URL) -> AsyncEngine:
+    """Creates the async engine and connection pool for a db_url once per process and returns it"""
+    engine = _ENGINES.get(db_url)
+    if engine is None:
+        engine = create_async_engine(
+            db_url,
+            poolclass=TimedAsyncAdaptedQueuePool,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=DB_POOL_PRE_PING
+        )
+        _ENGINES[db_url] = engine
+        instrument_engine(engine.sync_engine, database=engine.url.database)
+        if QUERY_AUDIT:
+            install_query_audit(engine.sync_engine)
+        # expire_on_commit=False keeps loaded objects readable after the session is closed,
+        # lazy refreshes are not possible with AsyncSession
+        _SESSION_FACTORIES[db_url] = async_sessionmaker(bind=engine, expire_on_commit=False)
+
+    return engine
+
+
+async def dispose_engines() -> None:
+    """Closes every pooled connection and empties the registry, called on application shutdown"""
+    for engine in _ENGINES.values():
+        await engine.dispose()
+
+    _ENGINES.clear()
+    _SESSION_FACTORIES.clear()
 
 
 class SessionManager:
-    def __init__(self, db_url):
-        self.engine = create_engine(db_url, pool_size=5, max_overflow=10)
-        self.Session = sessionmaker(bind=self.engine)
+    """Async context manager that borrows an AsyncSession from the process wide engine for db_url"""
+    def __init__(self, db_url: str = ASYNC_DB_URL):
+        self.engine = init_engine(db_url)
+        self.Session = _SESSION_FACTORIES[db_url]
+        self.session = None
 
-    def __enter__(self):
+    async def __aenter__(self) -> AsyncSession:
         # Create and return a session when the context is entered
         self.session = self.Session()
         return self.session
 
-    def __exit__(self, exc_type, exc_val, exc_tb):
-        # Cleanup session and engine only if session is not None
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        # Return the connection to the pool, the engine itself lives until shutdown
         if self.session:
-            self.session.close()
-        if self.engine:
-            self.engine.dispose()
+            await self.session.close()
+
+
+async def get_session() -> AsyncIterator[AsyncSession]:
+    """
+    FastAPI dependency that gives each request one session and one transaction (unit of work).
+    FastAPI caches dependencies per request, so every dependency of the route shares it.
+    The transaction is committed once when the request succeeds and rolled back otherwise.
+    Routes declare it with Depends(get_session, scope="function"): the commit then runs before
+    the response is sent, so a failed commit is never reported to the client as a success.
+    """
+    async with SessionManager() as session:
+        try:
+            yield session
+            await session.commit()
+
+        except Exception:
+            await session.rollback()
+            raise
+
+
+# bcrypt releases the GIL, so hashing runs in parallel on these threads while the event loop keeps
+# serving requests. The semaphore admits as many jobs as there are workers: callers wait on it
+# instead of in the executor queue, so a request cancelled while waiting leaves no work behind.
+# Both are made by init_password_hashing (or the first hash) and dropped by shutdown_password_hashing,
+# so the app can be started again in the same process (tests, benchmarks).
+_HASH_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_HASH_SLOTS: Optional[asyncio.Semaphore] = None
+
+
+def _hashing_pool() -> Tuple[ThreadPoolExecutor, asyncio.Semaphore]:
+    global _HASH_EXECUTOR, _HASH_SLOTS
+    if _HASH_EXECUTOR is None:
+        _HASH_EXECUTOR = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+        _HASH_SLOTS = asyncio.Semaphore(PASSWORD_HASH_WORKERS)
+
+    return _HASH_EXECUTOR, _HASH_SLOTS
+
+
+async def _run_hashing(func, *args):
+    executor, slots = _hashing_pool()
+    async with slots:
+        return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+
+
+def _password_bytes(password: str) -> bytes:
+    # bcrypt only uses the first 72 bytes, newer releases raise instead of truncating
+    return password.encode('utf-8')[:72]
+
+
+def _legacy_hash(password: str) -> str:
+    # Unsalted SHA-256 hashes stored before bcrypt, replaced on the next successful login
+    return hashlib.sha256(password.encode('utf-8')).hexdigest()
+
+
+def is_legacy_hash(password_hash: str) -> bool:
+    return not password_hash.startswith("$2")
+
+
+def needs_rehash(password_hash: str, rounds: int = PASSWORD_HASH_ROUNDS) -> bool:
+    """True for legacy SHA-256 hashes and for bcrypt hashes made with another cost than `rounds`"""
+    return is_legacy_hash(password_hash) or int(password_hash.split("$")[2]) != rounds
+
+
+def _hash(password: str, rounds: int) -> str:
+    return bcrypt.hashpw(_password_bytes(password), bcrypt.gensalt(rounds=rounds)).decode('utf-8')
+
+
+def _verify(password: str, password_hash: str) -> bool:
+    if is_legacy_hash(password_hash):
+        return hmac.compare_digest(_legacy_hash(password), password_hash)
+
+    return bcrypt.checkpw(_password_bytes(password), password_hash.encode('utf-8'))
+
+
+async def hash_password(password: str, rounds: int = PASSWORD_HASH_ROUNDS) -> str:
+    """Hashes the user's password with a salted bcrypt hash on the hashing pool"""
+    return await _run_hashing(_hash, password, rounds)
+
+
+async def verify_password(password: str, password_hash: str) -> bool:
+    """Checks a password against a bcrypt (or legacy SHA-256) hash on the hashing pool"""
+    return await _run_hashing(_verify, password, password_hash)
+
+
+# bcrypt hash of a random password, checked when the username doesn't exist (see init_password_hashing)
+_DUMMY_HASH = None
+
+
+async def init_password_hashing() -> None:
+    """
+    Starts the hashing threads and makes the dummy hash at startup, so that not even the first
+    unknown username login is faster
+    """
+    global _DUMMY_HASH
+    _hashing_pool()
+    if _DUMMY_HASH is None:
+        _DUMMY_HASH = await hash_password(secrets.token_hex(16))
+
+
+async def verify_dummy_password(password: str) -> None:
+    """
+    Spends the time of a real password check against a hash of the configured cost, so that a
+    login for an unknown username takes as long as one with a wrong password
+    """
+    await init_password_hashing()
+    await verify_password(password, _DUMMY_HASH)
+
 
+def shutdown_password_hashing() -> None:
+    """Stops the hashing threads, called on application shutdown"""
+    global _HASH_EXECUTOR, _HASH_SLOTS
+    if _HASH_EXECUTOR is not None:
+        _HASH_EXECUTOR.shutdown(wait=False, cancel_futures=True)
 
-def hash_password(password: str):
-        """Hashes and returns the user's password deterministically"""
-        return hashlib.sha256(password.encode('utf-8')).hexdigest()
+    _HASH_EXECUTOR, _HASH_SLOTS = None, None
@@ -1,95 +1,178 @@
 # Standard Imports
-from functools import wraps
+import uuid
 from datetime import datetime, timedelta, timezone
-from typing import Tuple
+from typing import NamedTuple, Optional
 
 # Third-Party Imports
 import jwt
-from fastapi import HTTPException, Depends
+from fastapi import HTTPException, Depends, Request
+from fastapi.responses import JSONResponse
 from fastapi.security import OAuth2PasswordBearer
 
 # Local Imports
 from config_file import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
-from backend.app.database import AdminData, UserData, TokenData
-from backend.app.schemas import Admin, User
+from backend.app.database import UserData, TokenData
+from backend.app.utils import SessionManager
+from backend.app.cache import REVOKED_TOKENS, TOKEN_VERSIONS
 
 OAUTH2_SCHEME = OAuth2PasswordBearer(tokenUrl="/api/user/login")
 
+USER_ROLE = "user"
+ADMIN_ROLE = "admin"
 
-def get_current_user(access_token: str = Depends(OAUTH2_SCHEME)) -> dict:
-    """Decode the JWT token and retrieve the current user."""
+# Role required by path prefix, the first matching prefix wins and unmatched paths are public
+ROUTE_POLICIES = [
+    ("/api/user/register", None),
+    ("/api/user/login", None),
+    ("/api/user/", USER_ROLE),
+    ("/api/task/", USER_ROLE),
+    ("/api/tag/", USER_ROLE),
+    ("/api/admin/", ADMIN_ROLE),
+]
+
+
+class Principal(NamedTuple):
+    """Authenticated caller built from the token claims, no db row is loaded for it"""
+    user_id: int
+    username: str
+    role: str
+
+
+def decode_token(access_token: str) -> dict:
+    """Decodes and validates a JWT token, raising 401 if it is expired, malformed or incomplete"""
     try:
-        payload = jwt.decode(access_token, SECRET_KEY, algorithms=[ALGORITHM])
-        username = payload.get("sub")
-        if username is None:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        
+        return jwt.decode(
+            access_token, SECRET_KEY, algorithms=[ALGORITHM],
+            options={"require": ["sub", "exp", "jti", "uid", "role", "ver"]}
+        )
+
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token has expired")
-    
+
     except jwt.PyJWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-    user = UserData().get_user(username=username)
 
-    return {"user": user, "token": access_token}
+def required_role(path: str) -> Optional[str]:
+    """Returns the role a path requires according to ROUTE_POLICIES, None for public paths"""
+    for prefix, role in ROUTE_POLICIES:
+        if path.startswith(prefix):
+            return role
 
+    return None
+
+
+async def authenticate(access_token: str, role: str) -> dict:
+    """
+    Validates a token for a role and returns {"user": Principal, "token", "claims"}, raising 401/403.
+    The revocation and token_version checks are answered by the in-memory caches, a session is
+    only opened when one of them can't answer.
+    """
+    payload = decode_token(access_token)
+    if payload["role"] != role:
+        raise HTTPException(status_code=403, detail="Unauthorized Access")
+
+    user_id = payload["uid"]
+    revoked = REVOKED_TOKENS.is_revoked(payload["jti"])
+    cached, token_version = TOKEN_VERSIONS.get(user_id) if role == USER_ROLE else (True, payload["ver"])
+
+    if revoked is None or not cached:
+        async with SessionManager() as session:
+            if revoked is None:
+                revoked = await TokenData(session).check_if_token_revoked(payload["jti"])
+
+            if not cached:
+                token_version = await UserData(session).get_token_version(user_id=user_id)
+                TOKEN_VERSIONS.set(user_id, token_version)
+
+    # The token_version of a user is bumped on password/username change, logout-all and delete,
+    # a deleted user has no token_version (also when the cache answered)
+    if revoked or token_version is None or token_version != payload["ver"]:
+        raise HTTPException(status_code=401, detail="Token expired - Please login again")
+
+    user = Principal(user_id=user_id, username=payload["sub"], role=role)
+
+    return {"user": user, "token": access_token, "claims": payload}
 
-def get_current_admin(access_token: str = Depends(OAUTH2_SCHEME)) -> Admin:
-    """Decode the JWT token and retrieve the current admin."""
-    try:
-        payload = jwt.decode(access_token, SECRET_KEY, algorithms=[ALGORITHM])
-        username = payload.get("sub")
-        if username is None:
-            raise HTTPException(status_code=403, detail="Unauthorized Access")
-        
-    except jwt.ExpiredSignatureError:
-        raise HTTPException(status_code=401, detail="Token has expired")
-    
-    except jwt.PyJWTError:
-        raise HTTPException(status_code=401, detail="Unauthorized Access")
 
-    admin = AdminData().get_admin(username=username)
-    return admin
+class AuthMiddleware:
+    """
+    Pure ASGI middleware that authenticates every request once, before routing. Requests to a path
+    that requires a role (see ROUTE_POLICIES) without a valid bearer token for it are answered here
+    with 401/403. The caller is put on the request scope, where get_current_user/get_current_admin
+    read it.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            return await self.app(scope, receive, send)
+
+        role = required_role(scope["path"])
+        if role is None:
+            return await self.app(scope, receive, send)
+
+        authorization = dict(scope["headers"]).get(b"authorization", b"").decode("latin-1")
+        scheme, _, access_token = authorization.partition(" ")
+        try:
+            if scheme.lower() != "bearer" or not access_token:
+                raise HTTPException(status_code=401, detail="Not authenticated")
+
+            current_user = await authenticate(access_token.strip(), role)
+
+        except HTTPException as e:
+            headers = {"WWW-Authenticate": "Bearer"} if e.status_code == 401 else None
+            response = JSONResponse({"detail": e.detail}, status_code=e.status_code, headers=headers)
+            return await response(scope, receive, send)
+
+        scope.setdefault("state", {})["current_user"] = current_user
+        await self.app(scope, receive, send)
+
+
+async def get_current_user(request: Request, access_token: str = Depends(OAUTH2_SCHEME)) -> dict:
+    """
+    Returns the user authenticated by AuthMiddleware as {"user": Principal, "token", "claims"}.
+    OAUTH2_SCHEME only documents the bearer token in the OpenAPI schema, it is not decoded again.
+    It is async so that FastAPI doesn't send it to the threadpool on every request.
+    """
+    current_user = getattr(request.state, "current_user", None)
+    if current_user is None or current_user["user"].role != USER_ROLE:
+        raise HTTPException(status_code=403, detail="Unauthorized User")
+
+    return current_user
+
+
+async def get_current_admin(request: Request, access_token: str = Depends(OAUTH2_SCHEME)) -> Principal:
+    """Returns the admin authenticated by AuthMiddleware"""
+    current_user = getattr(request.state, "current_user", None)
+    if current_user is None or current_user["user"].role != ADMIN_ROLE:
+        raise HTTPException(status_code=403, detail="Unauthorized Access")
 
+    return current_user["user"]
 
-def generate_token(username: str) -> str:
+
+def token_expiry(claims: dict) -> datetime:
+    """Returns the exp claim of a decoded token as an aware datetime"""
+    return datetime.fromtimestamp(claims["exp"], tz=timezone.utc)
+
+
+def generate_token(username: str, user_id: int, role: str = USER_ROLE, token_version: int = 0) -> str:
     """
     Generates a JWT token for a given username.
-    The token includes the username as the subject and an expiration time.
-    If the user is an admin, an admin token is returned; otherwise, a user tokenis returned.
+    The token includes the username as the subject, an expiration time and a unique id (jti)
+    which is what gets stored when the token is revoked.
+    It also carries the user_id (admin_id for admins), the role and the user's token_version,
+    so AuthMiddleware can authorise requests without loading the row.
     """
     token_data = {
         "sub": username,
-        "exp": datetime.now(tz=timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+        "uid": user_id,
+        "role": role,
+        "ver": token_version,
+        "exp": datetime.now(tz=timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES),
+        "jti": uuid.uuid4().hex
     }
     token = jwt.encode(token_data, SECRET_KEY, algorithm=ALGORITHM)
 
     return token
-
-
-def raise_exception(func):
-    """Raises an exception if the current user is not authorised"""
-    @wraps(func)
-    async def wrapper(*args, **kwargs):
-        user = kwargs.get("current_user").get("user")
-        token = kwargs.get("current_user").get("token")
-
-        if not user:
-            raise HTTPException(status_code=403, detail="Unauthorized User")
-        
-        if TokenData().check_if_token_revoked(token):
-            raise HTTPException(status_code=401, detail="Token expired - Please login again")
-        
-        return await func(*args, **kwargs)
-    return wrapper
-
-
-def only_admin(func):
-    """Raises an exception if the current admin is not authorised"""
-    @wraps(func)
-    async def wrapper(*args, **kwargs):
-        if not kwargs.get("current_admin"):
-            raise HTTPException(status_code=403, detail="Unauthorized User")
-        return await func(*args, **kwargs)
-    return wrapper
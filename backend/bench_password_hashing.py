@@ -0,0 +1,56 @@
+# Standard Imports
+import os
+import time
+import asyncio
+
+# Local Imports
+from config_file import PASSWORD_HASH_WORKERS
+from backend.app.utils import hash_password, verify_password, shutdown_password_hashing
+
+ROUNDS = [8, 10, 12, 14]
+LOGINS = 64 # concurrent logins per cost setting
+PASSWORD = "correct horse battery staple"
+
+
+async def event_loop_lag(stop: asyncio.Event) -> float:
+    """Largest delay of a 10 ms timer while the logins run, i.e. how long the loop was blocked"""
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.01)
+        worst = max(worst, time.perf_counter() - start - 0.01)
+
+    return worst
+
+
+async def bench(rounds: int) -> None:
+    password_hash = await hash_password(PASSWORD, rounds=rounds)
+    start = time.perf_counter()
+    await verify_password(PASSWORD, password_hash)
+    single = time.perf_counter() - start
+
+    stop = asyncio.Event()
+    lag = asyncio.create_task(event_loop_lag(stop))
+    start = time.perf_counter()
+    results = await asyncio.gather(*[verify_password(PASSWORD, password_hash) for _ in range(LOGINS)])
+    elapsed = time.perf_counter() - start
+    stop.set()
+
+    assert all(results)
+    print(
+        f"cost {rounds:>2}   {single * 1000:8.1f} ms per login alone   {LOGINS / elapsed:8.1f} logins/s"
+        f"   max event loop lag {await lag * 1000:6.1f} ms"
+    )
+
+
+async def main() -> None:
+    print(f"{LOGINS} concurrent logins on {PASSWORD_HASH_WORKERS} hashing workers, {os.cpu_count()} CPU cores")
+    for rounds in ROUNDS:
+        await bench(rounds)
+
+    shutdown_password_hashing()
+
+
+if __name__ == "__main__":
+    # python -m backend.bench_password_hashing (no database needed, only the password checks are timed)
+    asyncio.run(main())
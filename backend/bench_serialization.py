@@ -0,0 +1,71 @@
+# Standard Imports
+import time
+import statistics
+from datetime import date, timedelta
+
+# Third-Party Imports
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+# Local Imports
+from backend.app.schemas import Task, TaskStatus, TaskPriority
+from backend.app.models import TaskResponse, TasksResponse
+from backend.app.pagination import page_response
+
+TASK_COUNT = 10_000
+ROUNDS = 5
+TASK_FIELDS = list(TaskResponse.model_fields)
+
+
+def make_rows(count: int) -> list:
+    """Task rows as the column selects return them (one mapping per task)"""
+    return [
+        {
+            "user_id": 1,
+            "task_id": task_id,
+            "title": f"Task {task_id}",
+            "description": "Lorem ipsum dolor sit amet, consectetur adipiscing elit" if task_id % 2 else None,
+            "tag_id": task_id % 7 or None,
+            "tag": f"tag{task_id % 7}" if task_id % 7 else None,
+            "due_date": date(2026, 1, 1) + timedelta(days=task_id % 365),
+            "priority": list(TaskPriority)[task_id % 3],
+            "status": list(TaskStatus)[task_id % 3]
+        }
+        for task_id in range(1, count + 1)
+    ]
+
+
+def before(tasks: list) -> bytes:
+    """The old path: ORM objects -> TaskResponse(**__dict__) -> response_model validation -> jsonable_encoder -> json"""
+    items = [TaskResponse(**task.__dict__) for task in tasks]
+    response = TasksResponse(task_count=len(items), tasks=items)
+    validated = TasksResponse.model_validate(response.model_dump())
+    return JSONResponse(jsonable_encoder(validated)).body
+
+
+def after(rows: list) -> bytes:
+    """The new path: row mappings -> dicts -> orjson"""
+    return page_response(rows, "task_count", "tasks", TASK_FIELDS).body
+
+
+def measure(name: str, func, data) -> float:
+    timings = []
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        func(data)
+        timings.append(time.perf_counter() - start)
+
+    best = min(timings)
+    print(f"{name:<8} best {best * 1000:8.1f} ms   median {statistics.median(timings) * 1000:8.1f} ms   per {TASK_COUNT} tasks")
+    return best
+
+
+if __name__ == "__main__":
+    # python -m backend.bench_serialization (no database needed, only the serialization is timed)
+    rows = make_rows(TASK_COUNT)
+    tasks = [Task(**row) for row in rows] # transient ORM objects, their __dict__ carries _sa_instance_state
+
+    assert len(before(tasks)) and len(after(rows))
+    old = measure("before", before, tasks)
+    new = measure("after", after, rows)
+    print(f"speedup  {old / new:.1f}x")
@@ -0,0 +1,164 @@
+# Standard Imports
+import sys
+import uuid
+import asyncio
+from datetime import date, datetime, timedelta, timezone
+
+# Third-Party Imports
+from sqlalchemy import event, text
+
+# Local Imports
+from backend.app.utils import SessionManager, dispose_engines
+from backend.app.pagination import Page
+from backend.app.database import AdminData, UserData, TagData, TaskData, TokenData
+
+# Methods whose plan may contain a Seq Scan on purpose (full table listings)
+ALLOWED_SEQ_SCANS = {"UserData.get_task_stats"}
+
+# Methods whose LIMIT may sit on a Sort on purpose (aggregates, relevance ranking, rows out of a GIN index)
+ALLOWED_SORTS = {"UserData.get_task_stats", "TaskData.search_tasks_by_text", "TaskData.query_tasks (text)"}
+
+PAGE = Page(limit=10)
+
+# (name, call) pairs, every call gets the session and the ids of the scratch rows seeded below
+CHECKS = [
+    ("AdminData.get_admin", lambda s, ids: AdminData(s).get_admin(username=ids["username"])),
+    ("UserData.get_user", lambda s, ids: UserData(s).get_user(user_id=ids["user_id"])),
+    ("UserData.get_token_version", lambda s, ids: UserData(s).get_token_version(user_id=ids["user_id"])),
+    ("UserData.bump_token_version", lambda s, ids: UserData(s).bump_token_version(user_id=ids["user_id"])),
+    ("UserData.get_all_users", lambda s, ids: UserData(s).get_all_users(page=PAGE)),
+    ("UserData.get_recently_active_users",
+        lambda s, ids: UserData(s).get_recently_active_users(updated_at=datetime.now() - timedelta(days=1), page=PAGE)),
+    ("UserData.get_task_stats", lambda s, ids: UserData(s).get_task_stats(page=PAGE)),
+    ("TagData.get_tag", lambda s, ids: TagData(s).get_tag(user_id=ids["user_id"], tag=ids["tag"])),
+    ("TagData.get_all_tags", lambda s, ids: TagData(s).get_all_tags(user_id=ids["user_id"], page=PAGE)),
+    ("TagData.get_all_tags (next page)",
+        lambda s, ids: TagData(s).get_all_tags(user_id=ids["user_id"], page=Page(limit=10, after=["a", 1]))),
+    ("TaskData.create_task",
+        lambda s, ids: TaskData(s).create_task(user_id=ids["user_id"], title="check", tag=ids["tag"])),
+    ("TaskData.add_task_tags",
+        lambda s, ids: TaskData(s).add_task_tags(user_id=ids["user_id"], task_id=ids["task_id"], tags=[ids["tag"]])),
+    ("TaskData.get_task_tags", lambda s, ids: TaskData(s).get_task_tags(user_id=ids["user_id"], task_id=ids["task_id"])),
+    ("TaskData.get_tasks_by_tags (all)",
+        lambda s, ids: TaskData(s).get_tasks_by_tags(user_id=ids["user_id"], tags=[ids["tag"], "x"], match_all=True, page=PAGE)),
+    ("TaskData.get_tasks_by_tags (any)",
+        lambda s, ids: TaskData(s).get_tasks_by_tags(user_id=ids["user_id"], tags=[ids["tag"], "x"], match_all=False, page=PAGE)),
+    ("TaskData.remove_task_tag",
+        lambda s, ids: TaskData(s).remove_task_tag(user_id=ids["user_id"], task_id=ids["task_id"], tag=ids["tag"])),
+    ("TaskData.get_task_summary", lambda s, ids: TaskData(s).get_task_summary(user_id=ids["user_id"])),
+    ("TaskData.get_task", lambda s, ids: TaskData(s).get_task(user_id=ids["user_id"], task_id=ids["task_id"])),
+    ("TaskData.get_all_tasks", lambda s, ids: TaskData(s).get_all_tasks(user_id=ids["user_id"], page=PAGE)),
+    ("TaskData.get_tasks_by_tag",
+        lambda s, ids: TaskData(s).get_tasks_by_tag(user_id=ids["user_id"], tag=ids["tag"], page=PAGE)),
+    ("TaskData.get_tasks_by_status",
+        lambda s, ids: TaskData(s).get_tasks_by_status(user_id=ids["user_id"], status="Pending", page=PAGE)),
+    ("TaskData.get_tasks_by_priority",
+        lambda s, ids: TaskData(s).get_tasks_by_priority(user_id=ids["user_id"], priority="High", page=PAGE)),
+    ("TaskData.search_tasks_by_text",
+        lambda s, ids: TaskData(s).search_tasks_by_text(user_id=ids["user_id"], text="check", limit=10)),
+    ("TaskData.query_tasks (text)",
+        lambda s, ids: TaskData(s).query_tasks(user_id=ids["user_id"], page=PAGE, text="chec")),
+    ("TaskData.query_tasks (due_date)",
+        lambda s, ids: TaskData(s).query_tasks(
+            user_id=ids["user_id"], page=Page(limit=10, after=[date.today(), 1]),
+            due_after=date.today() - timedelta(days=7), sort="due_date"
+        )),
+    ("TaskData.query_tasks (title)",
+        lambda s, ids: TaskData(s).query_tasks(
+            user_id=ids["user_id"], page=Page(limit=10, after=["a", 1]), sort="title", descending=True
+        )),
+    ("TaskData.mark_overdue_tasks", lambda s, ids: TaskData(s).mark_overdue_tasks(user_id=ids["user_id"])),
+    ("TaskData.mark_overdue_tasks (sweeper)", lambda s, ids: TaskData(s).mark_overdue_tasks(batch_size=100)),
+    ("TaskData.update_task",
+        lambda s, ids: TaskData(s).update_task(user_id=ids["user_id"], task_id=ids["task_id"], status="Completed")),
+    ("TaskData.delete_task", lambda s, ids: TaskData(s).delete_task(user_id=ids["user_id"], task_id=ids["task_id"])),
+    ("TagData.update_tag",
+        lambda s, ids: TagData(s).update_tag(user_id=ids["user_id"], tag=ids["tag"], new_tag=ids["tag"] + "_")),
+    ("TagData.delete_tag", lambda s, ids: TagData(s).delete_tag(user_id=ids["user_id"], tag=ids["tag"] + "_")),
+    ("TokenData.revoke_token",
+        lambda s, ids: TokenData(s).revoke_token(jti=ids["jti"], expires_at=datetime.now(timezone.utc) + timedelta(hours=1))),
+    ("TokenData.check_if_token_revoked", lambda s, ids: TokenData(s).check_if_token_revoked(jti=uuid.uuid4().hex)),
+    ("TokenData.get_all_revoked_tokens", lambda s, ids: TokenData(s).get_all_revoked_tokens()),
+    ("TokenData.purge_expired_tokens", lambda s, ids: TokenData(s).purge_expired_tokens(batch_size=100)),
+    ("UserData.delete_user", lambda s, ids: UserData(s).delete_user(user_id=ids["user_id"])),
+]
+
+
+def sorts_before_limit(plan: str) -> bool:
+    """
+    True when a Sort node feeds the Limit of a plan, i.e. every matching row is read and sorted
+    before the page is cut instead of the page being read in index order
+    """
+    lines = plan.splitlines()
+    for index, line in enumerate(lines):
+        if line.lstrip(" ->").startswith("Limit"):
+            return any(node.lstrip(" ->").startswith("Sort ") for node in lines[index + 1:] if "->" in node)
+
+    return False
+
+
+async def seed(session) -> dict:
+    """Adds a scratch user with one tag and one task, returns their ids"""
+    username = f"check_indexes_{uuid.uuid4().hex[:8]}"
+    await UserData(session).add_user(username=username, password=uuid.uuid4().hex)
+    user = await UserData(session).get_user(username=username)
+    await TagData(session).add_tag(user_id=user.user_id, tag="check")
+    task = await TaskData(session).create_task(user_id=user.user_id, title="check", tag="check", due_date=date.today())
+
+    return {
+        "username": username, "user_id": user.user_id, "tag": "check",
+        "task_id": task["task"]["task_id"], "jti": uuid.uuid4().hex
+    }
+
+
+async def check_indexes() -> bool:
+    """
+    Runs every query method of database.py against the db and EXPLAINs each statement it sends.
+    Sequential scans are disabled for the transaction, so a plan still showing a Seq Scan has no
+    usable index, and a paginated statement whose Limit sits on a Sort has no index in its order.
+    Everything runs in one transaction that is rolled back at the end.
+    """
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if not statement.lstrip().upper().startswith(("EXPLAIN", "SET")):
+            captured.append((statement, parameters))
+
+    ok = True
+    async with SessionManager() as session:
+        event.listen(session.bind.sync_engine, "before_cursor_execute", capture)
+        try:
+            await session.execute(text("SET LOCAL enable_seqscan = off"))
+            ids = await seed(session)
+
+            for name, call in CHECKS:
+                captured.clear()
+                await call(session, ids)
+                await session.flush()
+
+                statements = list(captured)
+                connection = await session.connection()
+                for statement, parameters in statements:
+                    plan = "\n".join(
+                        row[0] for row in await connection.exec_driver_sql(f"EXPLAIN {statement}", parameters)
+                    )
+                    if "Seq Scan" in plan and name not in ALLOWED_SEQ_SCANS:
+                        ok = False
+                        print(f"SEQ SCAN  {name}\n{statement}\n{plan}\n")
+                    elif sorts_before_limit(plan) and name not in ALLOWED_SORTS:
+                        ok = False
+                        print(f"SORT      {name}\n{statement}\n{plan}\n")
+                    else:
+                        print(f"OK        {name}")
+
+        finally:
+            event.remove(session.bind.sync_engine, "before_cursor_execute", capture)
+            await session.rollback()
+
+    await dispose_engines()
+    return ok
+
+
+if __name__ == "__main__":
+    # python -m backend.check_indexes (after alembic upgrade head)
+    sys.exit(0 if asyncio.run(check_indexes()) else 1)
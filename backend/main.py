@@ -1,16 +1,50 @@
+from contextlib import asynccontextmanager
+
 import uvicorn
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from app.routers import router
 
+from config_file import ASYNC_DB_URL, REVOCATION_RESYNC_SECONDS, REVOKED_TOKENS_PURGE_SECONDS, OVERDUE_SWEEP_SECONDS, QUERY_AUDIT
+from backend.app.utils import init_engine, dispose_engines, init_password_hashing, shutdown_password_hashing
+from backend.auth_utils import AuthMiddleware
+from backend.app.metrics import MetricsMiddleware, render as render_metrics
+from backend.app.query_audit import QueryAuditMiddleware
+from backend.app.jobs import sync_revoked_tokens, purge_expired_tokens, sweep_overdue_tasks, start_jobs, stop_jobs
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Build the shared connection pool once at startup and release it on shutdown
+    init_engine(ASYNC_DB_URL)
+    await init_password_hashing()
+    await sync_revoked_tokens()
+    jobs = start_jobs([
+        (REVOCATION_RESYNC_SECONDS, sync_revoked_tokens),
+        (REVOKED_TOKENS_PURGE_SECONDS, purge_expired_tokens),
+        (OVERDUE_SWEEP_SECONDS, sweep_overdue_tasks),
+    ])
+    yield
+    await stop_jobs(jobs)
+    await dispose_engines()
+    shutdown_password_hashing()
 
-application = FastAPI()
+
+application = FastAPI(lifespan=lifespan)
+if QUERY_AUDIT:
+    # Innermost, so that the statements of the auth checks don't count against the route budgets
+    application.add_middleware(QueryAuditMiddleware)
+# Added before CORS so that it runs inside it, and 401/403 answers still carry the CORS headers
+application.add_middleware(AuthMiddleware)
 application.add_middleware(
     CORSMiddleware,
     allow_origins = ["*"],
     allow_methods = ["*"],
     allow_headers = ["*"]
 )
+# Outermost, so that the recorded latency covers the other middlewares too
+application.add_middleware(MetricsMiddleware)
 
 # application.openapi = lambda: {
 #     **application.openapi(),
@@ -29,6 +63,11 @@ application.add_middleware(
 async def app_start():
     return {"message": "application running!"}
 
+@application.get('/metrics', include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 application.include_router(router=router)
 
 if __name__ == "__main__":
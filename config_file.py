@@ -1,3 +1,5 @@
+import os
+
 # Local Database Configuration
 DB_CONFIG = {
     "username": "postgres",
@@ -8,7 +10,60 @@ DB_CONFIG = {
 }
 
 DB_URL = f"postgresql://{DB_CONFIG['username']}:{DB_CONFIG['password']}@{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['database']}"
+ASYNC_DB_URL = f"postgresql+asyncpg://{DB_CONFIG['username']}:{DB_CONFIG['password']}@{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['database']}"
+
+# Password Hashing (bcrypt, run on a thread pool off the event loop)
+PASSWORD_HASH_ROUNDS = 12 # bcrypt cost, each +1 doubles the time of a login, existing hashes are upgraded on login
+PASSWORD_HASH_WORKERS = 4 # hashes computed at the same time, at most one per CPU core is useful
 
 SECRET_KEY = "random_secret_key_for_jwt"
 ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 30
\ No newline at end of file
+ACCESS_TOKEN_EXPIRE_MINUTES = 30
+
+# Connection Pool Settings (shared by every SessionManager in the process)
+DB_POOL_SIZE = 5
+DB_MAX_OVERFLOW = 10
+DB_POOL_TIMEOUT = 30 # seconds to wait for a free connection
+DB_POOL_RECYCLE = 1800 # seconds after which a connection is replaced
+DB_POOL_PRE_PING = True
+
+# Revoked Tokens Cache
+REVOCATION_BLOOM_CAPACITY = 100_000
+REVOCATION_BLOOM_ERROR_RATE = 0.001
+REVOCATION_RESYNC_SECONDS = 30 # set to None to disable the periodic resync between workers
+REVOKED_TOKENS_PURGE_SECONDS = 3600 # how often expired rows are deleted from revoked_tokens
+REVOKED_TOKENS_PURGE_BATCH = 1000
+
+# Token Version Cache (see users.token_version)
+TOKEN_VERSION_CACHE_SECONDS = 5 # bound on how long other workers may accept an invalidated token
+TOKEN_VERSION_CACHE_SIZE = 50_000
+
+# Pagination of the listing endpoints
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# Batch task endpoint
+MAX_BATCH_SIZE = 500 # operations per request
+
+# Task export, rows fetched per round trip of the server side cursor
+EXPORT_BATCH_SIZE = 1000
+
+# Task import
+IMPORT_MAX_ERRORS = 1000 # rejected rows listed in the response, the rest are only counted
+IMPORT_READ_BATCH = 1000 # rows parsed per trip to the thread pool, reading the upload never blocks the event loop
+
+# Overdue Sweeper (Pending tasks past their due date are marked Overdue in the background)
+OVERDUE_SWEEP_SECONDS = 300 # set to None to disable the sweeper
+OVERDUE_SWEEP_BATCH = 1000
+
+# Metrics (served in the Prometheus text format on /metrics)
+METRICS_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0) # seconds
+METRICS_QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100) # SQL statements per request
+
+# Query Audit (development and tests, records every SQL statement of each request, see backend/app/query_audit.py)
+# Both flags are read at import and can be set from the environment, tests/conftest.py turns them on
+QUERY_AUDIT = os.environ.get("QUERY_AUDIT", "0") == "1"
+QUERY_AUDIT_STRICT = os.environ.get("QUERY_AUDIT_STRICT", "0") == "1" # raise QueryBudgetExceeded for requests over their QUERY_BUDGETS entry
+QUERY_AUDIT_SLOW_SECONDS = 0.1 # statements slower than this are logged with their EXPLAIN plan
+QUERY_AUDIT_N_PLUS_ONE = 3 # same statement this many times in one request is reported as N+1
+QUERY_AUDIT_DEFAULT_BUDGET = 5 # statements allowed for routes without a budget
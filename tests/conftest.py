@@ -0,0 +1,51 @@
+# Standard Imports
+import os
+import sys
+import uuid
+
+# Third-Party Imports
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def pytest_configure(config):
+    # Every request of the test run is audited, and one going over its query budget fails its test.
+    # Set before backend.main is imported, as the flags are read at import (export QUERY_AUDIT_STRICT=0 to only log)
+    os.environ.setdefault("QUERY_AUDIT", "1")
+    os.environ.setdefault("QUERY_AUDIT_STRICT", "1")
+
+    # backend/main.py imports `app.routers` relative to backend/
+    for path in (ROOT, os.path.join(ROOT, "backend")):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+
+
+@pytest.fixture(scope="session")
+def client():
+    """TestClient of the application against the configured db, the tests are skipped without one"""
+    from fastapi.testclient import TestClient
+    from sqlalchemy.exc import DBAPIError
+    from backend.main import application
+
+    test_client = TestClient(application)
+    try:
+        test_client.__enter__()
+
+    except (OSError, DBAPIError) as e:
+        pytest.skip(f"Database not reachable - {e}")
+
+    yield test_client
+    test_client.__exit__(None, None, None)
+
+
+@pytest.fixture
+def user_headers(client):
+    """Authorization headers of a scratch user, deleted after the test"""
+    username, password = f"test_{uuid.uuid4().hex[:8]}", uuid.uuid4().hex
+    client.post("/api/user/register", params={"username": username, "password": password})
+    token = client.post("/api/user/login", data={"username": username, "password": password}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    yield headers
+    client.delete("/api/user/delete", headers=headers)
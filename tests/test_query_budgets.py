@@ -0,0 +1,41 @@
+# Third-Party Imports
+import pytest
+
+# Local Imports
+from backend.app import query_audit
+from backend.app.query_audit import QueryBudgetExceeded
+
+# Read endpoints exercised within their declared budgets
+READS = [
+    "/api/task/all/",
+    "/api/task/summary",
+    "/api/task/query?sort=title",
+    "/api/task/query?sort=due_date",
+    "/api/task/status/?status=Pending",
+    "/api/task/text/?text=budget",
+    "/api/task/tags/?tags=budget",
+    "/api/tag/all",
+]
+
+
+@pytest.mark.parametrize("path", READS)
+def test_reads_stay_within_their_budget(client, user_headers, path):
+    client.post("/api/tag/create", params={"tag": "budget"}, headers=user_headers)
+    client.post("/api/task/create", json={"title": "budget", "tag": "budget"}, headers=user_headers)
+
+    assert client.get(path, headers=user_headers).status_code == 200
+
+
+def test_write_stays_within_its_budget(client, user_headers):
+    response = client.post("/api/task/create", json={"title": "budget"}, headers=user_headers)
+
+    assert response.status_code == 201
+
+
+def test_route_over_its_budget_fails(client, user_headers, monkeypatch):
+    # The listing issues the data_version lookup and the page query
+    monkeypatch.setattr(query_audit, "QUERY_AUDIT_STRICT", True)
+    monkeypatch.setitem(query_audit.QUERY_BUDGETS, ("GET", "/api/task/all/"), 1)
+
+    with pytest.raises(QueryBudgetExceeded, match="/api/task/all/ issued 2 statements, its budget is 1"):
+        client.get("/api/task/all/", headers=user_headers)